@@ -0,0 +1,24 @@
+"""
+Filename rules shared by the Python tools. src/main.js (getEventImagePath)
+implements the same safe_title rule in JavaScript; keep them in sync.
+"""
+
+import re
+
+# "{stem}-{width}w.{ext}" responsive variants written by optimize_images.py
+VARIANT_SUFFIX = re.compile(r"-\d+w$")
+
+
+def safe_title(title):
+    return title.replace(" ", "_").replace("/", "-").replace("'", "")
+
+
+def event_stem(event):
+    """The "{id}_{safe_title}" stem shared by an event's PNG and WebPs."""
+    return f"{event['id']}_{safe_title(event['title'])}"
+
+
+def stem_event_id(stem):
+    """Leading event id of a filename stem, or None if it has none."""
+    prefix = stem.split("_", 1)[0]
+    return int(prefix) if prefix.isdigit() else None
@@ -0,0 +1,57 @@
+"""
+JSON load/dump and prompt pipeline timings on a synthetic data.json.
+
+Usage:
+    python -m benchmarks.bench_data [--events 10000]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import Timer, make_data, peak_rss_mb
+
+
+def run(events=10_000):
+    import prepare_data
+
+    data = make_data(events)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.json")
+
+        with Timer() as dump:
+            text = json.dumps(data, indent=2, ensure_ascii=False)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        with Timer() as load:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        with Timer() as stages:
+            prepare_data.run_stages(data)
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        prepare_data.write_if_changed(path, text)
+        with Timer() as noop_write:
+            prepare_data.write_if_changed(path, text)
+        size = os.path.getsize(path)
+
+    return {
+        "events": events,
+        "json_mb": round(size / (1024 * 1024), 2),
+        "json_dump_s": round(dump.elapsed, 4),
+        "json_load_s": round(load.elapsed, 4),
+        "stages_s": round(stages.elapsed, 4),
+        "noop_write_s": round(noop_write.elapsed, 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.events), indent=2))
+
+
+if __name__ == "__main__":
+    main()
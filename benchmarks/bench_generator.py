@@ -0,0 +1,66 @@
+"""
+Scheduler throughput of image_generator.run_events against the local fake
+model (see fake_imagen.py) with configurable latency and quota errors.
+
+Usage:
+    python -m benchmarks.bench_generator [--events 200] [--latency 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+from benchmarks.common import Timer, peak_rss_mb
+
+
+def run(events=200, latency=0.05, quota_error_rate=0.0, workers=8, rate_per_min=6000):
+    import image_generator
+    from fake_imagen import FakeImageGenerationModel
+    from generation_ledger import GenerationLedger
+
+    image_generator.BACKOFF_BASE = latency
+    model = FakeImageGenerationModel(latency=latency, quota_error_rate=quota_error_rate, seed=0)
+    fake_events = [{"id": i, "title": f"Synthetic Event {i}"} for i in range(1, events + 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = GenerationLedger(os.path.join(tmp, "ledger.db"))
+        limiter = image_generator.TokenBucket(rate=rate_per_min / 60)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with Timer() as cold:
+                counts = image_generator.run_events(model, fake_events, ledger, limiter,
+                                                    workers, tmp, "fake")
+            with Timer() as warm:
+                image_generator.run_events(model, fake_events, ledger, limiter,
+                                           workers, tmp, "fake")
+        ledger.close()
+
+    return {
+        "events": events,
+        "latency_s": latency,
+        "quota_error_rate": quota_error_rate,
+        "workers": workers,
+        "requests": model.calls,
+        "cold_s": round(cold.elapsed, 3),
+        "events_per_s": round(events / cold.elapsed, 2),
+        "all_cached_s": round(warm.elapsed, 4),
+        "counts": counts,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--quota-error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.events, args.latency, args.quota_error_rate, args.workers),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
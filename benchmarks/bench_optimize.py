@@ -0,0 +1,69 @@
+"""
+Throughput of the optimize_images pipeline (decode, resize cascade, encode
+every variant, hash) over synthetic Imagen-sized PNGs.
+
+Usage:
+    python -m benchmarks.bench_optimize [--images 16] [--jobs 4]
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+
+from benchmarks.common import Timer, make_pngs, peak_rss_mb, run_child
+
+
+def child(fixture_dir, output_dir, jobs):
+    import optimize_images
+
+    optimize_images.OUTPUT_DIR = output_dir
+    names = sorted(os.listdir(fixture_dir))
+    work = [(os.path.join(fixture_dir, n), os.path.splitext(n)[0], {}) for n in names]
+    input_bytes = sum(os.path.getsize(p) for p, *_ in work)
+
+    with Timer() as t:
+        results = list(optimize_images.run_jobs(work, int(jobs)))
+    errors = [r["error"] for r in results if r["error"]]
+    if errors:
+        raise SystemExit(errors[0])
+
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "wall_s": round(t.elapsed, 3),
+        "images_per_s": round(len(work) / t.elapsed, 2),
+        "mb_per_s": round(input_bytes / (1024 * 1024) / t.elapsed, 2),
+        "output_mb": round(sum(r["output_size"] for r in results) / (1024 * 1024), 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_worker_rss_mb": round(children_kb / 1024, 1),
+    }))
+
+
+def run(images=16, jobs=None):
+    jobs = jobs or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "png")
+        output = os.path.join(tmp, "out")
+        os.makedirs(fixtures)
+        os.makedirs(output)
+        make_pngs(fixtures, images)
+        result = run_child("bench_optimize", fixtures, output, jobs)
+    return {"images": images, "jobs": jobs, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+    print(json.dumps(run(args.images, args.jobs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
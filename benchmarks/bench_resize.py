@@ -0,0 +1,70 @@
+"""
+Compare the standard and --low-memory decode/resize paths of
+optimize_images.optimize_image on synthetic Imagen-sized PNGs.
+
+Each path runs in a fresh subprocess so its peak RSS (ru_maxrss) isn't
+polluted by the other. Results are printed as JSON.
+
+Usage:
+    python -m benchmarks.bench_resize [--images 8] [--size 1408x1056]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import IMAGEN_SIZE, Timer, make_pngs, peak_rss_mb, run_child
+
+
+def child(mode, fixture_dir, output_dir):
+    import optimize_images
+
+    optimize_images.OUTPUT_DIR = output_dir
+    baseline = peak_rss_mb()
+
+    with Timer() as t:
+        for name in sorted(os.listdir(fixture_dir)):
+            result = optimize_images.optimize_image(os.path.join(fixture_dir, name),
+                                                    os.path.splitext(name)[0],
+                                                    low_memory=(mode == "low-memory"))
+            if result["error"]:
+                raise SystemExit(result["error"])
+
+    peak = peak_rss_mb()
+    print(json.dumps({"wall_s": round(t.elapsed, 3), "peak_rss_mb": peak,
+                      "work_rss_mb": round(peak - baseline, 1)}))
+
+
+def run(images=8, size=IMAGEN_SIZE):
+    results = {"images": images, "size": list(size)}
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "png")
+        os.makedirs(fixtures)
+        make_pngs(fixtures, images, size)
+
+        for mode in ("standard", "low-memory"):
+            output = os.path.join(tmp, mode)
+            os.makedirs(output)
+            results[mode] = run_child("bench_resize", mode, fixtures, output)
+            results[mode]["images_per_s"] = round(images / results[mode]["wall_s"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--size", default="1408x1056", help="fixture WIDTHxHEIGHT")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "FIXTURES", "OUTPUT"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+    size = tuple(int(n) for n in args.size.lower().split("x"))
+    print(json.dumps(run(args.images, size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
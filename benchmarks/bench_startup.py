@@ -0,0 +1,85 @@
+"""
+Startup check for `python -m pathtools status` and `plan`, which must
+stay fast and must never pull in the image or Vertex AI stacks.
+
+Each run is a fresh interpreter, timed from outside, that runs status
+and then plan. The child exits non-zero if any heavy module ended up in
+sys.modules (run_all records that as an error), and run standalone this
+exits non-zero too when a warm run takes longer than STARTUP_BUDGET_S.
+The deploy workflow runs it standalone on every push.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 3]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+
+from benchmarks.common import Timer, run_child
+
+HEAVY_MODULES = ("PIL", "numpy", "vertexai", "google.cloud", "google.api_core", "imagehash")
+STARTUP_BUDGET_S = 1.0  # whole process, interpreter start included; ~0.15s today
+
+
+def heavy_modules():
+    """The HEAVY_MODULES with anything loaded, submodules included."""
+    return [m for m in HEAVY_MODULES
+            if any(name == m or name.startswith(m + ".") for name in sys.modules)]
+
+
+def child():
+    from pathtools.__main__ import main as pathtools_main
+
+    timings = {}
+    for command in ("status", "plan"):
+        with Timer() as timer, contextlib.redirect_stdout(io.StringIO()):
+            pathtools_main([command])
+        heavy = heavy_modules()
+        if heavy:
+            sys.exit(f"pathtools {command} imported {', '.join(heavy)}")
+        timings[f"{command}_s"] = round(timer.elapsed, 4)
+    print(json.dumps(timings))
+
+
+def run(runs=3):
+    timings = []
+    for _ in range(runs):  # the first run may build the event cache
+        with Timer() as process:
+            result = run_child("bench_startup")
+        timings.append((process.elapsed, result["status_s"], result["plan_s"]))
+
+    warm_process, warm_status, warm_plan = min(timings[1:] or timings)
+    return {
+        "runs": runs,
+        "first_process_s": round(timings[0][0], 4),
+        "warm_process_s": round(warm_process, 4),
+        "warm_status_s": round(warm_status, 4),
+        "warm_plan_s": round(warm_plan, 4),
+        "within_budget": warm_process <= STARTUP_BUDGET_S,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+    try:
+        result = run(args.runs)
+    except subprocess.CalledProcessError as e:
+        sys.exit(e.stderr.strip() or f"child exited with status {e.returncode}")
+    print(json.dumps(result, indent=2))
+    if not result["within_budget"]:
+        sys.exit(f"pathtools status + plan took {result['warm_process_s']}s "
+                 f"(budget {STARTUP_BUDGET_S}s)")
+
+
+if __name__ == "__main__":
+    main()
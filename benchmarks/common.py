@@ -0,0 +1,80 @@
+"""Shared fixtures and measurement helpers for the benchmark suite."""
+
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGEN_SIZE = (1408, 1056)  # Imagen 3 output at 4:3
+
+
+def make_pngs(directory, count, size=IMAGEN_SIZE):
+    """Noisy RGB PNGs: incompressible enough to cost a realistic decode."""
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        channels = [Image.effect_noise(size, 40 + 10 * c) for c in range(3)]
+        path = os.path.join(directory, f"{i + 1}_Synthetic_Event.png")
+        Image.merge("RGB", channels).save(path)
+        paths.append(path)
+    return paths
+
+
+def make_data(events=10_000, levels=10, seed=0):
+    """A data.json-shaped dict with `events` events spread over `levels` levels."""
+    rng = random.Random(seed)
+    words = ("ink river stone empire star ocean fire light cell city war song "
+             "bridge moon crown seed storm glass wheel tide").split()
+
+    def sentence(n):
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    per_level = events // levels
+    return {"levels": [
+        {
+            "name": f"Level {lvl}",
+            "subtitle": sentence(4),
+            "events": [
+                {
+                    "id": lvl * per_level + i + 1,
+                    "title": sentence(3)[:-1].title(),
+                    "year": rng.randint(-13_800_000_000, 2025),
+                    "description": sentence(12),
+                    "info": "\n\n".join(" ".join(sentence(15) for _ in range(4)) for _ in range(2)),
+                }
+                for i in range(per_level)
+            ],
+        }
+        for lvl in range(levels)
+    ]}
+
+
+def peak_rss_mb():
+    """Peak RSS of this process so far (ru_maxrss is KB on Linux)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def run_child(module, *args):
+    """
+    Run `python -m benchmarks.<module> --child ...` in a fresh process so its
+    peak RSS is its own, and return the JSON it prints.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-m", f"benchmarks.{module}", "--child", *map(str, args)],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return json.loads(proc.stdout)
@@ -0,0 +1,93 @@
+"""
+Run the whole benchmark suite and emit one JSON document, tagged with the
+current commit, so results can be diffed between commits:
+
+    python -m benchmarks.run_all --output bench/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_all --compare bench/old.json bench/new.json
+
+Suites whose dependencies are missing (PIL, google-cloud) are recorded as
+skipped rather than failing the run.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+from benchmarks import bench_data, bench_generator, bench_optimize, bench_resize, bench_startup
+from benchmarks.common import ROOT
+
+SUITES = {
+    "data": bench_data.run,
+    "generator": bench_generator.run,
+    "optimize": bench_optimize.run,
+    "resize": bench_resize.run,
+    "startup": bench_startup.run,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(d, prefix=""):
+    for key, value in d.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(old_path, new_path):
+    """Print every numeric metric present in both files with its ratio."""
+    with open(old_path) as f:
+        old = dict(flatten(json.load(f)["results"]))
+    with open(new_path) as f:
+        new = dict(flatten(json.load(f)["results"]))
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key] / old[key] if old[key] else float("nan")
+        print(f"  {key:45s} {old[key]:>12g} → {new[key]:>12g}  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the asset pipeline benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES))
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {}
+    for name in args.only or sorted(SUITES):
+        try:
+            results[name] = SUITES[name]()
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+        except subprocess.CalledProcessError as e:
+            results[name] = {"error": e.stderr.strip().splitlines()[-1:]}
+
+    doc = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
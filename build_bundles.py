@@ -0,0 +1,73 @@
+"""
+Split src/data.json into small per-level bundles for the game client.
+
+Writes, minified and holding only the fields src/main.js reads:
+
+    src/levels/index.json     level names, subtitles, event counts, bundle file
+    src/levels/level-N.json   {"events": [...]} for level N (1-based)
+
+main.js imports the index eagerly and each level bundle through a lazy
+import.meta.glob, so Vite emits one chunk per level that is fetched when
+the player reaches it instead of every level's `info` text up front.
+Prompt fields and anything else the client doesn't read never ship.
+
+Files are only rewritten when their content changes, and bundles for
+levels that no longer exist are removed. Rerun after editing data.json:
+
+    python build_bundles.py
+"""
+
+import json
+import os
+
+from fileio import write_if_changed
+
+# ================= CONFIGURATION =================
+SOURCE_FILE = "src/data.json"
+OUTPUT_DIR = "src/levels"
+LEVEL_FIELDS = ["name", "subtitle"]
+EVENT_FIELDS = ["id", "title", "year", "description", "info"]
+# =================================================
+
+
+def compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_bundles(data):
+    """{filename: text} for the index and every level bundle."""
+    files = {}
+    index = []
+    for n, level in enumerate(data["levels"], 1):
+        name = f"level-{n}.json"
+        events = [{k: e[k] for k in EVENT_FIELDS if k in e} for e in level["events"]]
+        files[name] = compact({"events": events})
+        index.append({**{k: level[k] for k in LEVEL_FIELDS if k in level},
+                      "size": len(events), "file": name})
+    files["index.json"] = compact({"levels": index})
+    return files
+
+
+def main():
+    with open(SOURCE_FILE, "r", encoding="utf-8") as f:
+        source = f.read()
+    files = build_bundles(json.loads(source))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    written = [name for name, text in files.items()
+               if write_if_changed(os.path.join(OUTPUT_DIR, name), text)]
+    stale = [name for name in os.listdir(OUTPUT_DIR)
+             if name.endswith(".json") and name not in files]
+    for name in stale:
+        os.remove(os.path.join(OUTPUT_DIR, name))
+
+    total = sum(len(text.encode("utf-8")) for text in files.values())
+    index_size = len(files["index.json"].encode("utf-8"))
+    print(f"{len(files) - 1} level bundles in {OUTPUT_DIR}/: "
+          f"{len(written)} written, {len(stale)} removed")
+    print(f"  {len(source.encode('utf-8')) // 1024}KB source → {total // 1024}KB bundles, "
+          f"{index_size}B loaded up front")
+
+
+if __name__ == "__main__":
+    main()
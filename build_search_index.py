@@ -0,0 +1,201 @@
+"""
+Build the client's full-text + year-range search index from src/data.json.
+
+Each event's title, description and info are tokenised (lower-cased,
+accents folded, possessive 's dropped), stop words are removed and every
+token is reduced by a light suffix stemmer (plurals, -ing, -ed), so
+"forming", "formed" and "forms" all find "form". Events are numbered in
+year order, which turns "between X and Y" into a binary search for a
+document range, and every posting list is sorted by that number.
+
+Written to src/search_index.bin, little-endian:
+
+    "PSIX" u8 version, 3 pad bytes, u32 events, u32 terms, u32 words
+    4 pad bytes
+    f64 × events       sorted years (8-byte aligned: a Float64Array view)
+    then LEB128 varints:
+    events × (id, level index, title byte length, UTF-8 title)
+    terms  × (shared prefix with the previous term, suffix length, suffix)
+    words  × (shared prefix, suffix length, suffix, term number)
+    terms  × (posting bytes, document count,
+              documents × (doc delta, positions, positions × delta))
+
+Terms are sorted and front-coded, so the client can binary-search them.
+The word being typed is prefix-matched unstemmed, against the terms and
+against "words": every surface form whose stem differs from it
+("forming" -> term "form"), sorted and front-coded. So "formin" still
+finds "form", and a typed word never matches more than the same word
+followed by a space. Positions run across title, description and info
+with a FIELD_GAP between fields, so phrase matches never span two fields.
+
+src/search.js decodes the file and answers queries; tokenize() and
+stem() there must stay in step with this file.
+
+    python build_search_index.py
+"""
+
+import json
+import os
+import re
+import struct
+import unicodedata
+
+# ================= CONFIGURATION =================
+SOURCE_FILE = "src/data.json"
+OUTPUT_FILE = "src/search_index.bin"
+FIELDS = ["title", "description", "info"]
+FIELD_GAP = 16  # positions skipped between fields
+STOP_WORDS = frozenset("""
+    a an and are as at be been but by for from had has have he her his in into is it its
+    of on or she that the their them then there these they this to was were which while
+    who will with
+""".split())
+# =================================================
+
+MAGIC = b"PSIX"
+VERSION = 2
+
+TOKEN = re.compile(r"[a-z0-9]+")
+POSSESSIVE = re.compile(r"['’]s\b")
+
+
+def tokenize(text):
+    """Lower-case ASCII words with accents folded and possessives dropped."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = POSSESSIVE.sub("", "".join(c for c in text if not unicodedata.combining(c)))
+    return TOKEN.findall(text)
+
+
+def stem(word):
+    """
+    Strip one inflectional suffix, keeping at least three letters of stem.
+    No -ly rule: it mangles as many nouns (early, Italy, family) as it helps.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # stopped -> stop, but keep fall/pass/buzz
+            if word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            return word
+    return word
+
+
+def event_terms(event):
+    """[(surface word, position)] over the indexed fields, stop words skipped."""
+    terms = []
+    position = 0
+    for field in FIELDS:
+        for token in tokenize(event.get(field) or ""):
+            if token not in STOP_WORDS:
+                terms.append((token, position))
+            position += 1
+        position += FIELD_GAP
+    return terms
+
+
+def varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def front_code(strings, out, extra=None):
+    """Sorted strings as (shared prefix with the previous, suffix length, suffix)."""
+    previous = b""
+    for i, string in enumerate(strings):
+        encoded = string.encode("ascii")
+        shared = 0
+        while shared < min(len(previous), len(encoded)) and previous[shared] == encoded[shared]:
+            shared += 1
+        varint(shared, out)
+        varint(len(encoded) - shared, out)
+        out += encoded[shared:]
+        if extra:
+            varint(extra[i], out)
+        previous = encoded
+
+
+def build_index(data):
+    """(bytes, stats) of the encoded index for a data.json document."""
+    docs = sorted(((e, level) for level, l in enumerate(data["levels"]) for e in l["events"]),
+                  key=lambda d: d[0]["year"])
+
+    postings = {}  # term -> {doc: [positions]}
+    stems = {}     # surface word -> term
+    for doc, (event, _) in enumerate(docs):
+        for word, position in event_terms(event):
+            term = stems.setdefault(word, stem(word))
+            postings.setdefault(term, {}).setdefault(doc, []).append(position)
+    terms = sorted(postings)
+    term_number = {term: i for i, term in enumerate(terms)}
+    words = sorted(word for word, term in stems.items() if word != term)
+
+    out = bytearray(MAGIC)
+    out += struct.pack("<B3xIII4x", VERSION, len(docs), len(terms), len(words))
+    out += struct.pack(f"<{len(docs)}d", *(float(e["year"]) for e, _ in docs))
+
+    for event, level in docs:
+        title = event["title"].encode("utf-8")
+        varint(event["id"], out)
+        varint(level, out)
+        varint(len(title), out)
+        out += title
+
+    front_code(terms, out)
+    front_code(words, out, [term_number[stems[word]] for word in words])
+
+    position_count = 0
+    for term in terms:
+        block = bytearray()
+        varint(len(postings[term]), block)
+        last_doc = 0
+        for doc, positions in postings[term].items():  # inserted in doc order
+            varint(doc - last_doc, block)
+            last_doc = doc
+            varint(len(positions), block)
+            last = 0
+            for position in positions:
+                varint(position - last, block)
+                last = position
+            position_count += len(positions)
+        varint(len(block), out)
+        out += block
+
+    return bytes(out), {"events": len(docs), "terms": len(terms), "words": len(words),
+                        "positions": position_count}
+
+
+def main():
+    with open(SOURCE_FILE, "r", encoding="utf-8") as f:
+        source = f.read()
+    index, stats = build_index(json.loads(source))
+
+    try:
+        with open(OUTPUT_FILE, "rb") as f:
+            changed = f.read() != index
+    except FileNotFoundError:
+        changed = True
+    if changed:
+        tmp = OUTPUT_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(index)
+        os.replace(tmp, OUTPUT_FILE)
+
+    print(f"{'Wrote' if changed else 'Unchanged:'} {OUTPUT_FILE}: {stats['events']} events, "
+          f"{stats['terms']} terms, {stats['words']} inflected words, "
+          f"{stats['positions']} positions")
+    print(f"  {len(source.encode('utf-8')) // 1024}KB source → {len(index) // 1024}KB index")
+
+
+if __name__ == "__main__":
+    main()
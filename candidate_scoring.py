@@ -0,0 +1,116 @@
+"""
+Cheap local scoring for picking the best of several Imagen candidates.
+
+Each candidate is downsampled to SAMPLE_SIZE and scored in one vectorised
+NumPy pass over the whole batch on three heuristics of the ink wash style:
+
+  - monochrome: pixels should lie on a single paper -> ink colour line, so
+    the residual RGB variance off the first principal axis should be ~0
+  - no text: lettering shows up as small blocks packed with high-frequency
+    edges; we penalise the share of such blocks
+  - ink coverage: the fraction of pixels clearly darker than the paper
+    should sit inside INK_RANGE (not a blank sheet, not a black blot)
+
+Higher scores are better. Usage:
+
+    python candidate_scoring.py generated_images/candidates [--top 10]
+"""
+
+import argparse
+import os
+
+import numpy as np
+from PIL import Image
+
+# ================= CONFIGURATION =================
+SAMPLE_SIZE = (256, 192)  # 4:3, enough detail for lettering-sized edges
+BLOCK = 8                 # px block for the text detector
+TEXT_EDGE_THRESHOLD = 0.12
+INK_RANGE = (0.08, 0.45)
+WEIGHTS = {"monochrome": 4.0, "text": 3.0, "ink": 2.0}
+BATCH = 64                # candidates decoded and scored per NumPy pass
+# =================================================
+
+
+def load_samples(paths):
+    """Decode and downsample every candidate into one (N, H, W, 3) float array."""
+    samples = np.empty((len(paths), SAMPLE_SIZE[1], SAMPLE_SIZE[0], 3), dtype=np.float32)
+    for i, path in enumerate(paths):
+        with Image.open(path) as img:
+            img.draft("RGB", SAMPLE_SIZE)
+            samples[i] = np.asarray(img.convert("RGB").resize(SAMPLE_SIZE, Image.BILINEAR))
+    return samples / 255.0
+
+
+def score_samples(samples):
+    """Score a (N, H, W, 3) batch in [0, 1]; returns (scores, components)."""
+    n, h, w, _ = samples.shape
+    pixels = samples.reshape(n, -1, 3)
+
+    # Monochrome: share of colour variance off the principal axis
+    centred = pixels - pixels.mean(axis=1, keepdims=True)
+    cov = np.einsum("npi,npj->nij", centred, centred) / pixels.shape[1]
+    eig = np.linalg.eigvalsh(cov)  # ascending
+    off_axis = eig[:, :2].sum(axis=1) / np.maximum(eig.sum(axis=1), 1e-9)
+    monochrome = 1.0 - np.clip(off_axis * 10, 0, 1)
+
+    # Text: blocks whose mean gradient magnitude is unusually high
+    grey = samples @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    gx = np.abs(np.diff(grey, axis=2))[:, :-1, :]
+    gy = np.abs(np.diff(grey, axis=1))[:, :, :-1]
+    edges = gx + gy
+    bh, bw = (h - 1) // BLOCK, (w - 1) // BLOCK
+    blocks = edges[:, :bh * BLOCK, :bw * BLOCK].reshape(n, bh, BLOCK, bw, BLOCK).mean(axis=(2, 4))
+    text = 1.0 - np.clip((blocks > TEXT_EDGE_THRESHOLD).mean(axis=(1, 2)) * 20, 0, 1)
+
+    # Ink coverage relative to the paper tone (90th percentile luminance)
+    paper = np.percentile(grey.reshape(n, -1), 90, axis=1)[:, None, None]
+    coverage = (grey < paper - 0.25).mean(axis=(1, 2))
+    lo, hi = INK_RANGE
+    ink = 1.0 - np.clip(np.maximum(lo - coverage, coverage - hi) / lo, 0, 1)
+
+    components = {"monochrome": monochrome, "text": text, "ink": ink}
+    total = sum(WEIGHTS.values())
+    scores = sum(WEIGHTS[k] * v for k, v in components.items()) / total
+    return scores, components
+
+
+def score_paths(paths):
+    """Score any number of files in BATCH-sized chunks to bound memory."""
+    scores, components = [], {k: [] for k in WEIGHTS}
+    for i in range(0, len(paths), BATCH):
+        batch_scores, batch_components = score_samples(load_samples(paths[i:i + BATCH]))
+        scores.append(batch_scores)
+        for k, v in batch_components.items():
+            components[k].append(v)
+    if not scores:
+        return np.empty(0), {k: np.empty(0) for k in WEIGHTS}
+    return np.concatenate(scores), {k: np.concatenate(v) for k, v in components.items()}
+
+
+def rank(paths):
+    """Return [(score, path)] best first."""
+    scores, _ = score_paths(paths)
+    return sorted(zip(scores.tolist(), paths), reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank candidate images by style heuristics.")
+    parser.add_argument("directory")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.directory, f) for f in os.listdir(args.directory)
+        if f.lower().endswith(".png")
+    )
+    scores, components = score_paths(paths)
+    order = np.argsort(-scores)
+    for i in order[:args.top]:
+        print(f"  {scores[i]:.3f}  mono {components['monochrome'][i]:.2f}  "
+              f"text {components['text'][i]:.2f}  ink {components['ink'][i]:.2f}  "
+              f"{os.path.basename(paths[i])}")
+
+
+if __name__ == "__main__":
+    main()
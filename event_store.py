@@ -0,0 +1,140 @@
+"""
+Typed, indexed view of the event data shared by the Python tools.
+
+    store = EventStore.load("src/data_with_prompts.json")
+    store.by_id[101]                # O(1) lookup by event id
+    store.levels[2].events          # one level's events, in data order
+    store.between(-4.6e9, -3.8e9)   # events by year, via bisect
+
+Events and levels are __slots__ records, so there is no per-instance dict
+at tens of thousands of events. They also answer event["title"] and
+event.get("visual_prompt"), so functions written against the raw JSON
+dicts (build_prompt, event_stem, ...) take them unchanged.
+
+Parsing the JSON and building the records is what grows with the data, so
+the built store is pickled to CACHE_DIR, keyed by the source's path, and
+reused for as long as the source's size and mtime match. Standard library
+only, so the fast pathtools commands can use it.
+
+prepare_data.py still works on the raw JSON, because it rewrites the file
+and must keep it byte-identical.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import pickle
+
+# ================= CONFIGURATION =================
+CACHE_DIR = os.path.join(".cache", "events")
+CACHE_VERSION = 1  # bump when the record layout changes
+# =================================================
+
+EVENT_FIELDS = ("id", "title", "year", "description", "info", "image_prompt", "visual_prompt")
+LEVEL_FIELDS = ("name", "subtitle")
+
+
+class Record:
+    """Mapping-style read access to a __slots__ record; None means absent."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key, None) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+
+class Event(Record):
+    # level: 0-based level index; index: position in data order
+    __slots__ = EVENT_FIELDS + ("level", "index")
+
+    def __init__(self, raw, level, index):
+        for field in EVENT_FIELDS:
+            setattr(self, field, raw.get(field))
+        self.level = level
+        self.index = index
+
+    def __repr__(self):
+        return f"Event({self.id}, {self.title!r})"
+
+    def __reduce__(self):
+        # A flat tuple pickles and loads far faster than the default slot-state dict
+        return _restore_event, tuple(getattr(self, f) for f in self.__slots__)
+
+
+def _restore_event(*values):
+    event = Event.__new__(Event)
+    for field, value in zip(Event.__slots__, values):
+        setattr(event, field, value)
+    return event
+
+
+class Level(Record):
+    __slots__ = LEVEL_FIELDS + ("index", "events")
+
+    def __init__(self, raw, index, events):
+        for field in LEVEL_FIELDS:
+            setattr(self, field, raw.get(field))
+        self.index = index
+        self.events = events
+
+
+class EventStore:
+    def __init__(self, data):
+        self.levels = []
+        self.events = []
+        for level_index, raw_level in enumerate(data["levels"]):
+            events = []
+            for raw in raw_level["events"]:
+                event = Event(raw, level_index, len(self.events))
+                events.append(event)
+                self.events.append(event)
+            self.levels.append(Level(raw_level, level_index, events))
+        self.by_id = {event.id: event for event in self.events}
+        self.by_year = sorted(self.events, key=lambda e: e.year)
+        self.years = [event.year for event in self.by_year]
+
+    def __len__(self):
+        return len(self.events)
+
+    def between(self, first, last):
+        """Events with first <= year <= last, oldest first."""
+        return self.by_year[bisect.bisect_left(self.years, first):
+                            bisect.bisect_right(self.years, last)]
+
+    @classmethod
+    def load(cls, path, cache_dir=CACHE_DIR):
+        """Build from a data JSON file, or reuse the pickle cached for its current size + mtime."""
+        st = os.stat(path)
+        stamp = (CACHE_VERSION, st.st_size, st.st_mtime_ns)
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        cache = os.path.join(cache_dir, f"{key}.pickle")
+        try:
+            with open(cache, "rb") as f:
+                if pickle.load(f) == stamp:
+                    return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            pass
+
+        with open(path, "r", encoding="utf-8") as f:
+            store = cls(json.load(f))
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(stamp, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(store, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache)
+        except OSError:
+            pass  # read-only checkout: just don't cache
+        return store
@@ -0,0 +1,60 @@
+"""
+Local stand-in for vertexai's ImageGenerationModel.
+
+Sleeps for a jittered latency, randomly raises ResourceExhausted, and
+"returns" flat grey PNGs (4x3 unless size is given), so the generation
+scheduler can be exercised without spending quota:
+
+    python image_generator.py --fake --output-dir /tmp/fake_images
+"""
+
+import random
+import struct
+import time
+import zlib
+
+from google.api_core.exceptions import ResourceExhausted
+
+
+def _tiny_png(width=4, height=3, grey=200):
+    """Encode a flat greyscale PNG with nothing but the standard library."""
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    rows = b"".join(b"\x00" + bytes([grey]) * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FakeGeneratedImage:
+    def __init__(self, data):
+        self._image_bytes = data
+
+    def save(self, location, include_generation_parameters=False):
+        with open(location, "wb") as f:
+            f.write(self._image_bytes)
+
+
+class FakeImageGenerationModel:
+    def __init__(self, latency=2.0, quota_error_rate=0.2, seed=None, size=(4, 3)):
+        self.latency = latency
+        self.size = size
+        self.quota_error_rate = quota_error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_pretrained(cls, model_name):
+        return cls()
+
+    def generate_images(self, prompt, number_of_images=1, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency * self.random.uniform(0.5, 1.5))
+        if self.random.random() < self.quota_error_rate:
+            raise ResourceExhausted("fake quota exceeded")
+        return [FakeGeneratedImage(_tiny_png(*self.size)) for _ in range(number_of_images)]
@@ -0,0 +1,59 @@
+"""
+File helpers shared by the build scripts and pathtools: content hashing,
+JSON caches and manifests, and atomic writes that leave unchanged files
+alone. Standard library only, so `python -m pathtools` can import it
+without pulling in Pillow or NumPy.
+"""
+
+import hashlib
+import json
+import os
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_json(path, default=None):
+    """Parsed JSON at path, or default ({} if None) if it's missing or corrupt."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {} if default is None else default
+
+
+def write_json(data, path, indent=None):
+    """Write atomically so an interrupted run can't corrupt the file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def write_if_changed(path, text):
+    """Atomically replace path with text unless it already holds exactly that."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def write_json_if_changed(path, data):
+    """Write compact JSON only if it differs, so Vite's cache isn't needlessly busted."""
+    return write_if_changed(
+        path, json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":")))
@@ -5,15 +5,14 @@ Each visual_prompt is a short, concrete scene description (1-2 sentences)
 that tells an image model WHAT to paint — the subject, composition, and mood.
 The consistent sumi-e style suffix is added later by image_generator.py.
 
-Usage:
-    python generate_visual_prompts.py
+This is the visual_prompt stage of the data pipeline: prepare_data.py
+loads src/data.json once, adds a "visual_prompt" key to each event, and
+writes src/data_with_prompts.json. Running this file runs the whole
+pipeline:
 
-This reads src/data_with_prompts.json, adds a "visual_prompt" key to each
-event, and writes the result back.
+    python generate_visual_prompts.py
 """
 
-import json
-
 # ── Subject-specific visual descriptions ──
 # Maps event id -> a concrete visual scene for the ink wash painting.
 # These describe WHAT to paint, not HOW (style is added by image_generator.py).
@@ -339,34 +338,15 @@ VISUAL_PROMPTS = {
 }
 
 
-def main():
-    with open("src/data_with_prompts.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    updated = 0
-    missing = []
-
-    for level in data["levels"]:
-        for event in level["events"]:
-            eid = event["id"]
-            if eid in VISUAL_PROMPTS:
-                event["visual_prompt"] = VISUAL_PROMPTS[eid]
-                updated += 1
-            else:
-                missing.append(f"  ID {eid}: {event['title']}")
-
-    # Write back
-    with open("src/data_with_prompts.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    print(f"Updated {updated} events with visual_prompt fields.")
-    if missing:
-        print(f"\nWARNING: {len(missing)} events have no visual_prompt mapping:")
-        for m in missing:
-            print(m)
-    else:
-        print("All events covered!")
+def add_visual_prompt(event):
+    """Returns False when VISUAL_PROMPTS has no scene for this event."""
+    prompt = VISUAL_PROMPTS.get(event["id"])
+    if prompt is None:
+        return False
+    event["visual_prompt"] = prompt
+    return True
 
 
 if __name__ == "__main__":
-    main()
+    import prepare_data
+    prepare_data.main()
@@ -0,0 +1,142 @@
+"""
+Persistent record of every image generation, keyed by event id + prompt hash.
+The hash covers the final prompt text, model and request settings, so
+editing one event's visual_prompt invalidates exactly that event.
+
+Replaces the old os.path.exists() skip check and failed_prompts.txt: each
+row stores the status, how many paid requests it took, the last request
+latency, the model and the output path. The statuses are:
+
+  generated  an image was saved to output_path
+  blocked    the safety filter refused the prompt; skipped until it changes
+  failed     every retry failed; the next run tries again
+  rejected   `image_dedup.py --reject` flagged the image as a near-duplicate,
+             replacing its "generated" row (or adding a placeholder row if
+             it predates the ledger). generate_image must not treat it as
+             generated: it redraws the event, and because the event has a
+             row, the PNG still on disk isn't adopted either
+
+The whole table is loaded into a dict on open so planning a rerun is an
+O(1) lookup per event, and renaming an event's title maps back to the
+image already paid for instead of generating a new one.
+
+That rename case only works while the title isn't part of the prompt,
+which holds when the prompt comes from the event's visual_prompt (every
+event in src/data_with_prompts.json has one). An event without a
+visual_prompt hashes its title, so renaming it regenerates the image.
+
+Usage:
+    python generation_ledger.py    # summary + blocked prompts
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+LEDGER_FILE = "generation_ledger.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    event_id    INTEGER NOT NULL,
+    prompt_hash TEXT    NOT NULL,
+    status      TEXT    NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    latency_s   REAL,
+    model       TEXT,
+    output_path TEXT,
+    error       TEXT,
+    updated_at  TEXT    NOT NULL,
+    PRIMARY KEY (event_id, prompt_hash)
+)
+"""
+
+COLUMNS = ("event_id", "prompt_hash", "status", "attempts", "latency_s",
+           "model", "output_path", "error", "updated_at")
+
+
+def prompt_hash(prompt, **settings):
+    """
+    Cache key for one generation: the final prompt text plus everything
+    else that changes the output (model, aspect ratio, safety settings...).
+    """
+    key = json.dumps({"prompt": prompt, **settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class GenerationLedger:
+    """Thread-safe SQLite ledger with an in-memory index of all rows."""
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        # timeout: sharded runs may share one ledger file across processes
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self.rows = {
+            (row[0], row[1]): dict(zip(COLUMNS, row))
+            for row in self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM generations")
+        }
+        self.events = {event_id for event_id, _ in self.rows}
+
+    def get(self, event_id, phash):
+        return self.rows.get((event_id, phash))
+
+    def has_event(self, event_id):
+        """True if any prompt for this event has been recorded."""
+        return event_id in self.events
+
+    def record(self, event_id, phash, status, attempts=0, latency_s=None,
+               model=None, output_path=None, error=None):
+        """Upsert a row; attempts accumulate across runs."""
+        with self.lock:
+            previous = self.rows.get((event_id, phash))
+            row = {
+                "event_id": event_id,
+                "prompt_hash": phash,
+                "status": status,
+                "attempts": attempts + (previous["attempts"] if previous else 0),
+                "latency_s": latency_s,
+                "model": model,
+                "output_path": output_path,
+                "error": error,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO generations ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                [row[c] for c in COLUMNS],
+            )
+            self.conn.commit()
+            self.rows[(event_id, phash)] = row
+            self.events.add(event_id)
+            return row
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    ledger = GenerationLedger(LEDGER_FILE)
+    counts = {}
+    for row in ledger.rows.values():
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    attempts = sum(row["attempts"] for row in ledger.rows.values())
+
+    print(f"{len(ledger.rows)} prompts in {LEDGER_FILE}, {attempts} paid requests")
+    for status, n in sorted(counts.items()):
+        print(f"  {status:10s} {n}")
+
+    blocked = sorted((r for r in ledger.rows.values() if r["status"] == "blocked"),
+                     key=lambda r: r["event_id"])
+    if blocked:
+        print("\nBlocked by safety filter:")
+        for row in blocked:
+            print(f"  ID {row['event_id']} | {row['output_path']} | {row['error']}")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Find near-duplicate generated images with perceptual hashes.
+
+Every PNG in generated_images/ is reduced to a 32x32 greyscale thumbnail
+(in a process pool) and hashed in one vectorised NumPy pass:
+
+  - pHash: 64 bits from the low-frequency 8x8 block of a 32x32 DCT,
+    thresholded at its median
+  - dHash: 64 bits of left/right brightness gradients on a 9x8 thumbnail
+
+Hashes are cached in .cache/phash.json, keyed by filename + size +
+mtime, so reruns only decode new or changed files; generated_images/
+itself holds only the PNGs. Near-duplicate pairs come from a BK-tree
+over the Hamming distance of the combined 128-bit hash, which prunes most
+comparisons instead of checking all n^2 pairs.
+
+Pairs are grouped into clusters; every event in a cluster except the
+lowest id is flagged. With --reject the flagged events are marked
+"rejected" in the generation ledger, so the next `generate` run redraws
+them.
+
+Usage:
+    python image_dedup.py [--threshold 12] [--reject]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from asset_names import stem_event_id
+from fileio import load_json, write_json
+
+# ================= CONFIGURATION =================
+INPUT_DIR = "generated_images"
+CACHE_FILE = os.path.join(".cache", "phash.json")
+THRESHOLD = 12  # max differing bits (of 128) for a near-duplicate
+# =================================================
+
+DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    m[0] /= np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+DCT = _dct_matrix(DCT_SIZE)
+
+
+def thumbnail(path):
+    """Decode one image to the 32x32 and 9x8 greyscale thumbnails the hashes need."""
+    with Image.open(path) as img:
+        img.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))
+        grey = img.convert("L")
+        grey.thumbnail((DCT_SIZE * 4, DCT_SIZE * 4))
+        return (np.asarray(grey.resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS), dtype=np.uint8),
+                np.asarray(grey.resize((9, 8), Image.LANCZOS), dtype=np.uint8))
+
+
+def _pack(bits):
+    """(N, 64) bool -> list of N Python ints."""
+    packed = np.packbits(bits.astype(np.uint8), axis=1)
+    return [int.from_bytes(row.tobytes(), "big") for row in packed]
+
+
+def hash_batch(large, small):
+    """
+    Vectorised pHash + dHash for a batch of thumbnails:
+    large (N, 32, 32), small (N, 8, 9). Returns a 128-bit int per image.
+    """
+    freq = DCT @ large.astype(np.float64) @ DCT.T
+    low = freq[:, :8, :8].reshape(len(large), -1)
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)  # skip the DC term
+    phash = _pack(low > medians)
+    dhash = _pack(small[:, :, 1:] > small[:, :, :-1])
+    return [(p << 64) | d for p, d in zip(phash, dhash)]
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for radius queries."""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, key):
+        node = self.root
+        if node is None:
+            self.root = [value, key, {}]
+            return
+        while True:
+            d = (value ^ node[0]).bit_count()
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, key, {}]
+                return
+            node = child
+
+    def query(self, value, radius):
+        """[(distance, key)] of every stored value within radius."""
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = (value ^ node[0]).bit_count()
+            if d <= radius:
+                found.append((d, node[1]))
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return found
+
+
+def index_hashes(directory=INPUT_DIR, cache_path=CACHE_FILE, jobs=None):
+    """{filename: 128-bit hash} for every PNG, decoding only uncached files."""
+    cache = load_json(cache_path)
+    stats = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(".png") and entry.is_file():
+                st = entry.stat()
+                stats[entry.name] = [st.st_size, st.st_mtime_ns]
+
+    todo = [name for name, stat in stats.items()
+            if cache.get(name, {}).get("stat") != stat]
+    if todo:
+        print(f"Hashing {len(todo)} images ({len(stats) - len(todo)} cached)")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            thumbs = list(pool.map(thumbnail, [os.path.join(directory, n) for n in todo],
+                                   chunksize=8))
+        hashes = hash_batch(np.stack([t[0] for t in thumbs]), np.stack([t[1] for t in thumbs]))
+        for name, value in zip(todo, hashes):
+            cache[name] = {"stat": stats[name], "hash": f"{value:032x}"}
+
+    cache = {name: entry for name, entry in cache.items() if name in stats}
+    write_json(cache, cache_path)
+    return {name: int(entry["hash"], 16) for name, entry in cache.items()}
+
+
+def find_duplicates(hashes, threshold=THRESHOLD):
+    """Near-duplicate pairs [(distance, name_a, name_b)] via one BK-tree pass."""
+    tree = BKTree()
+    pairs = []
+    for name, value in sorted(hashes.items()):
+        for distance, other in tree.query(value, threshold):
+            pairs.append((distance, other, name))
+        tree.add(value, name)
+    return sorted(pairs)
+
+
+def clusters(pairs):
+    """Union-find the pairs into groups of mutually near-duplicate files."""
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for _, a, b in pairs:
+        parent[find(a)] = find(b)
+    groups = {}
+    for name in parent:
+        groups.setdefault(find(name), []).append(name)
+    return [sorted(g, key=lambda n: (stem_event_id(os.path.splitext(n)[0]) or 0, n))
+            for g in groups.values()]
+
+
+def reject(flagged, ledger_file):
+    """
+    Mark events "rejected" so the next generate run redraws them. Images
+    that predate the ledger get a placeholder row, which stops generate
+    from adopting the existing file.
+    """
+    from generation_ledger import GenerationLedger
+
+    ledger = GenerationLedger(ledger_file)
+    for event_id, path in flagged.items():
+        rows = [r for (eid, _), r in ledger.rows.items()
+                if eid == event_id and r["status"] == "generated"]
+        for row in rows or [{"prompt_hash": ""}]:
+            ledger.record(event_id, row["prompt_hash"], "rejected",
+                          output_path=path, error="near-duplicate")
+    ledger.close()
+
+
+def main(argv=None):
+    from generation_ledger import LEDGER_FILE
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate generated images.")
+    parser.add_argument("--threshold", type=int, default=THRESHOLD,
+                        help="max differing bits of 128 (default %(default)s)")
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    parser.add_argument("--reject", action="store_true",
+                        help="mark flagged events 'rejected' in the ledger for regeneration")
+    parser.add_argument("--ledger", default=LEDGER_FILE)
+    args = parser.parse_args(argv)
+
+    hashes = index_hashes(jobs=args.jobs)
+    pairs = find_duplicates(hashes, args.threshold)
+    groups = clusters(pairs)
+
+    print(f"{len(hashes)} images, {len(pairs)} near-duplicate pairs in {len(groups)} clusters")
+    flagged = {}
+    for group in groups:
+        keep, *dupes = group
+        print(f"\n  keep  {keep}")
+        for name in dupes:
+            print(f"  redo  {name}")
+            event_id = stem_event_id(os.path.splitext(name)[0])
+            if event_id is not None:
+                flagged[event_id] = os.path.join(INPUT_DIR, name)
+
+    if flagged:
+        print(f"\nFlagged events: {','.join(map(str, sorted(flagged)))}")
+        if args.reject:
+            reject(flagged, args.ledger)
+            print(f"Marked {len(flagged)} events rejected in {args.ledger}")
+
+
+if __name__ == "__main__":
+    main()
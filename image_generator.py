@@ -1,9 +1,18 @@
+import argparse
 import json
 import os
+import random
+import shutil
+import threading
 import time
-import vertexai
-from vertexai.preview.vision_models import ImageGenerationModel
-from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, InvalidArgument
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# vertexai and google.api_core are imported where they're used, so status
+# and planning tools can import this module without paying for them
+from asset_names import safe_title
+from event_store import EventStore
+from generation_ledger import LEDGER_FILE, GenerationLedger, prompt_hash
+from instrumentation import recorder
 
 # ================= CONFIGURATION =================
 PROJECT_ID = "p1-history-images"
@@ -19,8 +28,23 @@ OUTPUT_DIR = "generated_images"
 JSON_FILE = "src/data_with_prompts.json"
 
 MAX_RETRIES = 3
-COOLDOWN_SECS = 60
-DELAY_BETWEEN = 10  # seconds between requests
+COOLDOWN_SECS = 60  # upper bound for a single backoff sleep
+DELAY_BETWEEN = 10  # seconds between requests (sustained quota rate)
+
+WORKERS = 4         # concurrent generate_images calls
+BURST = 2           # requests allowed back-to-back before the rate applies
+BACKOFF_BASE = 5    # first backoff after a quota error, doubled per retry
+
+CANDIDATES = 1                # images per request (Imagen allows up to 4)
+CANDIDATE_DIR = "candidates"  # under OUTPUT_DIR; every candidate is kept
+
+# Request settings; all of them are part of the ledger's prompt hash
+GENERATION_SETTINGS = {
+    "language": "en",
+    "aspect_ratio": ASPECT_RATIO,
+    "safety_filter_level": "block_few",
+    "person_generation": "allow_adult",
+}
 # =================================================
 
 
@@ -28,109 +52,465 @@ def build_prompt(event):
     """
     Style: black ink wash on aged parchment, like the Big Bang reference.
     The subject should be recognizable but rendered in loose ink wash sumi-e.
+    Uses the event's visual_prompt scene (see generate_visual_prompts.py)
+    when it has one, otherwise just the title.
     """
-    title = event["title"]
+    subject = event.get("visual_prompt") or event["title"]
     return (
-        f"{title}. "
+        f"{subject}. "
         f"Black ink wash and Sumi-e (wabi sabi) on aged cream parchment paper. "
         f"Monochrome, no color. No text, no words, no letters."
     )
 
 
-def setup_environment():
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def setup_environment(output_dir=OUTPUT_DIR, project=PROJECT_ID):
+    import vertexai
+
+    vertexai.init(project=project, location=LOCATION)
+    os.makedirs(output_dir, exist_ok=True)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker.
+
+    Tokens refill at `rate` per second up to `burst`. A quota error calls
+    throttle(), which halves the rate and holds all workers for the backoff
+    period; each success nudges the rate back up towards its ceiling.
+    """
+
+    def __init__(self, rate, burst=BURST):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.hold_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.hold_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                backoff = now < self.hold_until
+                wait = max(self.hold_until - now, (1 - self.tokens) / self.rate)
+            recorder.sleep("backoff" if backoff else "quota", wait)
+
+    def throttle(self, delay):
+        with self.lock:
+            self.rate = max(self.max_rate / 8, self.rate / 2)
+            self.hold_until = max(self.hold_until, time.monotonic() + delay)
+            self.tokens = 0.0
+
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
 
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter, capped at COOLDOWN_SECS."""
+    return random.uniform(0, min(COOLDOWN_SECS, BACKOFF_BASE * 2 ** attempt))
 
-def generate_image(model, prompt, event_id, event_title, retries=0):
-    safe_title = event_title.replace(" ", "_").replace("/", "-").replace("'", "")
-    filename = f"{event_id}_{safe_title}.png"
-    file_path = os.path.join(OUTPUT_DIR, filename)
 
-    if os.path.exists(file_path):
+def save_best_candidate(images, file_path):
+    """
+    Keep every candidate under CANDIDATE_DIR, then copy the best-scoring one
+    (see candidate_scoring.py) to file_path. Returns (index, score).
+    """
+    from candidate_scoring import rank
+
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    candidate_dir = os.path.join(os.path.dirname(file_path), CANDIDATE_DIR)
+    os.makedirs(candidate_dir, exist_ok=True)
+
+    paths = []
+    for i, image in enumerate(images):
+        path = os.path.join(candidate_dir, f"{stem}.{i + 1}.png")
+        image.save(location=path, include_generation_parameters=True)
+        paths.append(path)
+
+    score, best = rank(paths)[0]
+    shutil.copyfile(best, file_path)
+    return paths.index(best), score
+
+
+def image_bytes(image, file_path):
+    """The PNG bytes the API returned, or the saved file if the object doesn't expose them."""
+    data = getattr(image, "_image_bytes", None)
+    if data is None:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    return data
+
+
+def generate_image(model, prompt, event_id, event_title, ledger, limiter=None,
+                   output_dir=OUTPUT_DIR, model_name=MODEL_NAME, candidates=1,
+                   publisher=None):
+    """
+    Generate and save one event image, recording the outcome in the ledger.
+
+    Returns "skipped", "generated", "blocked" or "failed". Prompts the ledger
+    already has an image for (even under an older title) or that were blocked
+    by the safety filter return immediately without taking a token from the
+    limiter. A changed prompt, model or setting hashes differently and
+    regenerates over the old file. With candidates > 1 one request returns
+    several images and the best is picked locally. With a publisher (see
+    optimize_images.Publisher) the new image is also queued for web
+    encoding straight from memory.
+    """
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, InvalidArgument
+
+    filename = f"{event_id}_{safe_title(event_title)}.png"
+    file_path = os.path.join(output_dir, filename)
+    phash = prompt_hash(prompt, model=model_name, **GENERATION_SETTINGS)
+
+    entry = ledger.get(event_id, phash)
+    if entry and entry["status"] == "blocked":
+        print(f"  [SKIP] {event_id}: blocked by safety filter in an earlier run")
+        return "blocked"
+    if entry and entry["status"] == "generated" and os.path.exists(entry["output_path"]):
+        if entry["output_path"] != file_path:
+            # Title was renamed since the image was paid for: move, don't
+            # regenerate. Only reachable when the prompt comes from
+            # visual_prompt; a title-only prompt hashes differently once renamed
+            os.replace(entry["output_path"], file_path)
+            ledger.record(event_id, phash, "generated", latency_s=entry["latency_s"],
+                          model=entry["model"], output_path=file_path)
+            print(f"  [MOVE] {event_id}: {os.path.basename(entry['output_path'])} -> {filename}")
+        else:
+            print(f"  [SKIP] {event_id}: already exists")
+        return "skipped"
+    if not ledger.has_event(event_id) and os.path.exists(file_path):
+        # Image predates the ledger: adopt it rather than paying for it again
+        ledger.record(event_id, phash, "generated", output_path=file_path)
         print(f"  [SKIP] {event_id}: already exists")
-        return True
+        return "skipped"
 
-    print(f"  [GEN]  {event_id}: {event_title}")
+    attempts = 0
+    latency = None
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            limiter.acquire()
+        print(f"  [GEN]  {event_id}: {event_title}")
 
-    try:
-        images = model.generate_images(
-            prompt=prompt,
-            number_of_images=1,
-            language="en",
-            aspect_ratio=ASPECT_RATIO,
-            safety_filter_level="block_few",
-            person_generation="allow_adult",
-        )
+        attempts += 1
+        start = time.monotonic()
+        try:
+            with recorder.span("generate", event_id=event_id, attempt=attempts) as span:
+                try:
+                    images = model.generate_images(
+                        prompt=prompt,
+                        number_of_images=candidates,
+                        **GENERATION_SETTINGS,
+                    )
+                except Exception as e:
+                    span["error"] = type(e).__name__
+                    raise
 
+        except (ResourceExhausted, ServiceUnavailable) as e:
+            latency = time.monotonic() - start
+            recorder.count("quota_errors")
+            if attempt == MAX_RETRIES:
+                print(f"         -> {event_id}: rate limit, max retries reached — skipping")
+                ledger.record(event_id, phash, "failed", attempts, latency,
+                              model_name, file_path, str(e))
+                return "failed"
+            delay = backoff_delay(attempt)
+            print(f"         -> {event_id}: rate limit, backing off {delay:.1f}s "
+                  f"(retry {attempt+1}/{MAX_RETRIES})")
+            recorder.count("retries")
+            if limiter:
+                limiter.throttle(delay)
+            else:
+                recorder.sleep("backoff", delay, event_id=event_id)
+            continue
+
+        except InvalidArgument as e:
+            print(f"         -> {event_id}: BLOCKED by safety filter")
+            ledger.record(event_id, phash, "blocked", attempts, time.monotonic() - start,
+                          model_name, file_path, str(e))
+            return "blocked"
+
+        except Exception as e:
+            print(f"         -> {event_id}: ERROR: {e}")
+            ledger.record(event_id, phash, "failed", attempts, time.monotonic() - start,
+                          model_name, file_path, str(e))
+            return "failed"
+
+        latency = time.monotonic() - start
+        if limiter:
+            limiter.recover()
         if images:
-            images[0].save(location=file_path, include_generation_parameters=True)
-            print(f"         -> saved {filename}")
-            return True
-        else:
-            print(f"         -> no image returned")
-            return False
-
-    except (ResourceExhausted, ServiceUnavailable):
-        if retries < MAX_RETRIES:
-            print(f"         -> rate limit, cooling {COOLDOWN_SECS}s (retry {retries+1}/{MAX_RETRIES})")
-            time.sleep(COOLDOWN_SECS)
-            return generate_image(model, prompt, event_id, event_title, retries + 1)
-        else:
-            print(f"         -> rate limit, max retries reached — skipping")
-            return False
+            # A bad candidate or a full disk fails this event, not the run
+            try:
+                if candidates > 1:
+                    with recorder.span("save", event_id=event_id, candidates=len(images)):
+                        best, score = save_best_candidate(images, file_path)
+                    note = f"candidate {best + 1}/{len(images)}, score {score:.2f}, "
+                else:
+                    with recorder.span("save", event_id=event_id):
+                        images[0].save(location=file_path, include_generation_parameters=True)
+                    best, note = 0, ""
+                data = image_bytes(images[best], file_path) if publisher else None
+            except Exception as e:
+                print(f"         -> {event_id}: ERROR saving: {e}")
+                ledger.record(event_id, phash, "failed", attempts, latency,
+                              model_name, file_path, f"save: {e}")
+                return "failed"
+            ledger.record(event_id, phash, "generated", attempts, latency,
+                          model_name, file_path)
+            print(f"         -> saved {filename} ({note}{latency:.1f}s)")
+            if publisher:
+                try:
+                    publisher.submit(data, file_path)
+                except Exception as e:  # e.g. a broken pool; the PNG is safe on disk
+                    print(f"         -> {event_id}: not published ({e}); "
+                          f"run optimize_images.py later")
+            return "generated"
+        print(f"         -> {event_id}: no image returned")
+        ledger.record(event_id, phash, "failed", attempts, latency,
+                      model_name, file_path, "no image returned")
+        return "failed"
+
+    return "failed"
+
 
-    except InvalidArgument as e:
-        print(f"         -> BLOCKED by safety filter")
-        with open("failed_prompts.txt", "a") as log:
-            log.write(f"ID {event_id} | {event_title} | {e}\n")
-        return False
+class Checkpoint:
+    """
+    Which events of one run selection are finished, so a crashed run resumes
+    at the next pending event without re-walking the finished ones.
+
+    The file is only reused when its selection (levels/ids/shard) matches,
+    and is deleted once a run ends with nothing left pending. Failed events
+    are never marked, so they are retried on resume.
+    """
+
+    def __init__(self, path, selection):
+        self.path = path
+        self.selection = selection
+        self.done = set()
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("selection") == selection:
+                self.done = set(saved["done"])
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
 
-    except Exception as e:
-        print(f"         -> ERROR: {e}")
-        return False
+    def pending(self, events):
+        return [event for event in events if event["id"] not in self.done]
 
+    def mark(self, event_id):
+        with self.lock:
+            self.done.add(event_id)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"selection": self.selection, "done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
 
-def main():
-    setup_environment()
-    print(f"Project: {PROJECT_ID}")
-    print(f"Model:   {MODEL_NAME}")
-    print(f"Ratio:   {ASPECT_RATIO}\n")
+    def finish(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
+
+def parse_id_list(text):
+    """ "3,7,10-12" -> {3, 7, 10, 11, 12} """
+    ids = set()
     try:
-        model = ImageGenerationModel.from_pretrained(MODEL_NAME)
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        return
+        for part in filter(None, text.split(",")):
+            lo, _, hi = part.partition("-")
+            ids.update(range(int(lo), int(hi or lo) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ids like 3,7,10-12, got {text!r}")
+    return ids
 
+
+def parse_shard(text):
+    """ "2/4" -> (2, 4): the second of four disjoint shards """
     try:
-        with open(JSON_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        index, count = (int(n) for n in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {text!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be 1..{count}")
+    return index, count
+
+
+def select_events(store, levels=None, ids=None, shard=None):
+    """
+    Events filtered by level number, event id and shard, in data order.
+    Level numbers are 1-based, like src/levels/level-N.json and
+    images/atlas/level-N.webp. Shards split on event id (id % N), so each
+    event always lands in the same shard.
+    """
+    if ids is not None:
+        events = sorted((store.by_id[i] for i in ids if i in store.by_id),
+                        key=lambda e: e.index)
+    else:
+        events = store.events
+    return [event for event in events
+            if (levels is None or event.level + 1 in levels)
+            and (not shard or event.id % shard[1] == shard[0] - 1)]
+
+
+def run_events(model, events, ledger, limiter, workers=WORKERS, output_dir=OUTPUT_DIR,
+               model_name=MODEL_NAME, candidates=CANDIDATES, checkpoint=None, publisher=None):
+    """Fan events out over a thread pool and tally the results by status."""
+    counts = {"generated": 0, "skipped": 0, "blocked": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(generate_image, model, build_prompt(event), event["id"],
+                        event["title"], ledger, limiter, output_dir, model_name,
+                        candidates, publisher): event["id"]
+            for event in events
+        }
+        for future in as_completed(futures):
+            status = future.result()
+            counts[status] += 1
+            recorder.count(status)
+            if checkpoint and status != "failed":
+                checkpoint.mark(futures[future])
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate ink wash event images with Imagen.")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"concurrent requests (default {WORKERS})")
+    parser.add_argument("--rate", type=float, default=60 / DELAY_BETWEEN,
+                        help="sustained requests per minute (default %(default)s)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--project", default=PROJECT_ID,
+                        help="Vertex AI project, e.g. one quota project per shard")
+    parser.add_argument("--levels", type=parse_id_list,
+                        help="only these levels, numbered from 1 like level-N.json, e.g. 1,3-5")
+    parser.add_argument("--ids", type=parse_id_list, help="only these event ids, e.g. 1,101-105")
+    parser.add_argument("--shard", type=parse_shard, help="I/N: run the I-th of N shards")
+    parser.add_argument("--checkpoint",
+                        help="progress file (default: OUTPUT_DIR/.checkpoint[.IofN].json)")
+    parser.add_argument("--candidates", type=int, default=CANDIDATES, choices=range(1, 5),
+                        help="images per request; the best is picked by local scoring")
+    parser.add_argument("--ledger", default=LEDGER_FILE,
+                        help="SQLite generation ledger (default %(default)s)")
+    parser.add_argument("--publish", action="store_true",
+                        help="encode web variants of each new image as it arrives "
+                             "(see optimize_images.py)")
+    parser.add_argument("--publish-jobs", type=int, default=None,
+                        help="encoder processes for --publish (default: all cores)")
+    parser.add_argument("--publish-low-memory", action="store_true",
+                        help="--publish with optimize_images.py --low-memory")
+    parser.add_argument("--publish-atlas", action="store_true",
+                        help="--publish with optimize_images.py --atlas")
+    parser.add_argument("--publish-target-ssim", type=float,
+                        help="--publish with optimize_images.py --target-ssim")
+    parser.add_argument("--publish-budget-kb", type=int,
+                        help="--publish with optimize_images.py --budget-kb")
+    parser.add_argument("--publish-no-fingerprint", action="store_true",
+                        help="--publish with optimize_images.py --no-fingerprint")
+    parser.add_argument("--trace", help="append JSON-lines stage events to this file")
+    parser.add_argument("--profile", nargs="+", metavar="STAGE",
+                        help="cProfile these stages (generate, save, ...)")
+    parser.add_argument("--fake", action="store_true",
+                        help="use the local fake model instead of Vertex AI")
+    parser.add_argument("--fake-latency", type=float, default=2.0,
+                        help="mean seconds per fake request")
+    parser.add_argument("--fake-quota-rate", type=float, default=0.2,
+                        help="probability a fake request raises ResourceExhausted")
+    parser.add_argument("--fake-width", type=int, default=4,
+                        help="width of the fake 4:3 images, e.g. 1600 to exercise --publish")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    recorder.configure(trace_path=args.trace, profile=args.profile)
+
+    if args.fake:
+        from fake_imagen import FakeImageGenerationModel
+        os.makedirs(args.output_dir, exist_ok=True)
+        model = FakeImageGenerationModel(latency=args.fake_latency,
+                                         quota_error_rate=args.fake_quota_rate,
+                                         size=(args.fake_width, args.fake_width * 3 // 4))
+        model_name = "fake"
+        print(f"Model:   fake ({args.fake_latency}s latency, "
+              f"{args.fake_quota_rate:.0%} quota errors)")
+    else:
+        setup_environment(args.output_dir, args.project)
+        print(f"Project: {args.project}")
+        print(f"Model:   {MODEL_NAME}")
+        model_name = MODEL_NAME
+        try:
+            from vertexai.preview.vision_models import ImageGenerationModel
+            model = ImageGenerationModel.from_pretrained(MODEL_NAME)
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return
+    print(f"Ratio:   {ASPECT_RATIO}")
+    print(f"Workers: {args.workers} @ {args.rate:g} req/min\n")
+
+    try:
+        store = EventStore.load(JSON_FILE)
     except FileNotFoundError:
         print(f"ERROR: '{JSON_FILE}' not found.")
         return
 
-    generated = 0
-    skipped = 0
-    failed = 0
-
-    for level in data["levels"]:
-        print(f"\n{'='*50}")
-        print(f"  {level['name']}")
-        print(f"{'='*50}")
+    unknown = sorted(n for n in args.levels or () if not 1 <= n <= len(store.levels))
+    if unknown:
+        print(f"ERROR: no level {', '.join(map(str, unknown))}; "
+              f"levels are numbered 1-{len(store.levels)}.")
+        return
 
-        for event in level["events"]:
-            prompt = build_prompt(event)
+    events = select_events(store, args.levels, args.ids, args.shard)
+    selection = {
+        "levels": sorted(args.levels) if args.levels is not None else None,
+        "ids": sorted(args.ids) if args.ids is not None else None,
+        "shard": list(args.shard) if args.shard else None,
+    }
+    suffix = f".{args.shard[0]}of{args.shard[1]}" if args.shard else ""
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(args.output_dir,
+                                                            f".checkpoint{suffix}.json"),
+                            selection)
+    pending = checkpoint.pending(events)
+    if len(pending) < len(events):
+        print(f"Resuming: {len(events) - len(pending)} of {len(events)} events already done\n")
 
-            ok = generate_image(model, prompt, event["id"], event["title"])
-            if ok:
-                generated += 1
-            else:
-                failed += 1
+    limiter = TokenBucket(rate=args.rate / 60)
+    ledger = GenerationLedger(args.ledger)
+    publisher = None
+    if args.publish:
+        from optimize_images import Publisher
+        tune = None
+        if args.publish_target_ssim is not None or args.publish_budget_kb is not None:
+            tune = {"ssim": args.publish_target_ssim, "budget_kb": args.publish_budget_kb}
+        publisher = Publisher(args.publish_jobs, low_memory=args.publish_low_memory,
+                              atlas=args.publish_atlas, tune=tune, input_dir=args.output_dir,
+                              fingerprint_assets=not args.publish_no_fingerprint)
+        print(f"Publishing web variants with {publisher.workers} encoders\n")
 
-            time.sleep(DELAY_BETWEEN)
+    start = time.monotonic()
+    counts = run_events(model, pending, ledger, limiter, args.workers, args.output_dir,
+                        model_name, args.candidates, checkpoint, publisher)
+    if publisher:
+        publisher.close()
+    elapsed = time.monotonic() - start
+    ledger.close()
+    if not counts["failed"]:
+        checkpoint.finish()
 
-    print(f"\nDone! Generated: {generated}  Failed: {failed}")
+    print(f"\nDone in {elapsed:.0f}s! Generated: {counts['generated']}  "
+          f"Skipped: {counts['skipped']}  Blocked: {counts['blocked']}  "
+          f"Failed: {counts['failed']}")
+    recorder.print_summary()
+    recorder.close()
 
 
 if __name__ == "__main__":
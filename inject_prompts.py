@@ -1,8 +1,9 @@
-import json
+"""
+image_prompt stage for the data pipeline (see prepare_data.py).
 
-# 1. Update this line to look in the src folder
-with open('src/data.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+Adds the chat-style "image_prompt" to each event. Running this file runs
+the whole pipeline.
+"""
 
 PROMPT_TEMPLATE = (
     "Can you generate an image for \"{title}\" in the following style: "
@@ -10,12 +11,12 @@ PROMPT_TEMPLATE = (
     "abstract ink-bleed or wash illustrations."
 )
 
-for level in data['levels']:
-    for event in level['events']:
-        event['image_prompt'] = PROMPT_TEMPLATE.format(title=event['title'])
 
-# 2. Update this line to save it back into the src folder
-with open('src/data_with_prompts.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=2)
+def add_image_prompt(event):
+    event['image_prompt'] = PROMPT_TEMPLATE.format(title=event['title'])
+    return True
 
-print("Done! Check your 'src' folder for 'data_with_prompts.json'.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    import prepare_data
+    prepare_data.main()
@@ -0,0 +1,190 @@
+"""
+Per-stage timers, counters and optional cProfile hooks for the asset tools.
+
+Wrap work in `recorder.span("stage", **fields)` (or call
+`recorder.sleep(kind, secs)` instead of time.sleep) and every span becomes
+a JSON-lines event in the --trace file. At exit, print_summary() reports
+count / total / p50 / p95 per stage, the counters, and time spent sleeping.
+
+Worker processes can't write to the parent's trace file, so spans recorded
+outside the configuring process are buffered; ship them back with drain()
+and feed them to merge() in the parent. A process that was never
+configured and has no configured parent (RECORD_ENV, inherited by workers)
+drops events instead, so library callers don't accumulate them forever.
+
+Profiling: configure(profile=["encode"]) wraps every "encode" span in its
+own cProfile.Profile, dumps it to PROFILE_DIR, and print_summary() merges
+the dumps per stage. The setting travels to worker processes through the
+PROFILE_ENV environment variable. Only one profiler can be active per
+process (Python 3.12+ enforces it), so a span that starts while another
+is being profiled is timed but not profiled.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+PROFILE_DIR = "profiles"
+PROFILE_ENV = "PATH_OF_ALL_THINGS_PROFILE"  # "<dir>:<stage>,<stage>"
+RECORD_ENV = "PATH_OF_ALL_THINGS_RECORDER"  # pid of the configured owner
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profile_lock = threading.Lock()
+        self.durations = defaultdict(list)
+        self.counters = Counter()
+        self.pending = []
+        self.trace = None
+        self.owner_pid = None
+        self.profile_count = 0
+        self.profile_dir, _, stages = os.environ.get(PROFILE_ENV, "").partition(":")
+        self.profile_stages = set(filter(None, stages.split(",")))
+
+    def configure(self, trace_path=None, profile=None, profile_dir=PROFILE_DIR):
+        """Make this process the owner: it writes the trace and keeps the totals."""
+        self.owner_pid = os.getpid()
+        os.environ[RECORD_ENV] = str(self.owner_pid)
+        if trace_path:
+            self.trace = open(trace_path, "a", encoding="utf-8")
+        if profile:
+            os.makedirs(profile_dir, exist_ok=True)
+            for stage in profile:
+                for stale in glob.glob(os.path.join(profile_dir, f"{stage}.*.prof")):
+                    os.remove(stale)
+            self.profile_dir = profile_dir
+            self.profile_stages = set(profile)
+            os.environ[PROFILE_ENV] = f"{profile_dir}:{','.join(profile)}"
+
+    def _is_owner(self):
+        return self.owner_pid == os.getpid()
+
+    def _buffers(self):
+        """Not the owner, but a worker of one that will drain() and merge()."""
+        return os.environ.get(RECORD_ENV, str(os.getpid())) != str(os.getpid())
+
+    def add(self, stage, duration, **fields):
+        """Record one finished span."""
+        event = {"ts": round(time.time(), 3), "stage": stage,
+                 "dur_s": round(duration, 6), **fields}
+        with self.lock:
+            if not self._is_owner():
+                if self._buffers():
+                    self.pending.append(event)
+                return
+            self.durations[stage].append(duration)
+            if self.trace:
+                self.trace.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def count(self, name, n=1):
+        with self.lock:
+            if not self._is_owner():
+                if self._buffers():
+                    self.pending.append({"counter": name, "n": n})
+                return
+            self.counters[name] += n
+
+    @contextmanager
+    def span(self, stage, **fields):
+        profiler = None
+        if stage in self.profile_stages and self.profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            duration = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+                self.profile_lock.release()
+                with self.lock:
+                    self.profile_count += 1
+                    n = self.profile_count
+                profiler.dump_stats(os.path.join(
+                    self.profile_dir, f"{stage}.{os.getpid()}.{threading.get_ident()}.{n}.prof"))
+            self.add(stage, duration, **fields)
+
+    def sleep(self, kind, seconds, **fields):
+        """time.sleep that shows up as a "sleep.<kind>" stage."""
+        if seconds <= 0:
+            return
+        with self.span(f"sleep.{kind}", **fields):
+            time.sleep(seconds)
+
+    def drain(self):
+        """Buffered events from a non-owner process, for sending to the parent."""
+        with self.lock:
+            events, self.pending = self.pending, []
+        return events
+
+    def merge(self, events):
+        for event in events:
+            if "counter" in event:
+                self.count(event["counter"], event["n"])
+            else:
+                event = dict(event)
+                stage, duration = event.pop("stage"), event.pop("dur_s")
+                event.pop("ts", None)
+                self.add(stage, duration, **event)
+
+    def summary(self):
+        stages = {}
+        for stage, values in sorted(self.durations.items()):
+            values = sorted(values)
+            stages[stage] = {
+                "count": len(values),
+                "total_s": round(sum(values), 3),
+                "p50_s": round(percentile(values, 50), 4),
+                "p95_s": round(percentile(values, 95), 4),
+            }
+        sleeping = sum(v["total_s"] for k, v in stages.items() if k.startswith("sleep."))
+        return {"stages": stages, "counters": dict(self.counters),
+                "sleep_total_s": round(sleeping, 3)}
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary["stages"] and not summary["counters"]:
+            return
+        print(f"\n  {'stage':24s} {'count':>6s} {'total':>9s} {'p50':>9s} {'p95':>9s}")
+        for stage, s in summary["stages"].items():
+            print(f"  {stage:24s} {s['count']:>6d} {s['total_s']:>8.2f}s "
+                  f"{s['p50_s']:>8.3f}s {s['p95_s']:>8.3f}s")
+        print(f"  Time sleeping: {summary['sleep_total_s']:.1f}s")
+        if summary["counters"]:
+            print("  " + "  ".join(f"{k}: {v}" for k, v in sorted(summary["counters"].items())))
+
+        for stage in sorted(self.profile_stages):
+            files = glob.glob(os.path.join(self.profile_dir, f"{stage}.*.prof"))
+            if files:
+                print(f"\n  cProfile for '{stage}' ({len(files)} spans):")
+                stats = pstats.Stats(*files)
+                stats.files = []  # don't list every dump file in the header
+                stats.sort_stats("cumulative").print_stats(15)
+
+        if self.trace:
+            self.trace.write(json.dumps({"ts": round(time.time(), 3), "summary": summary}) + "\n")
+
+    def close(self):
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+
+
+# Process-wide recorder shared by every module; main() calls configure()
+recorder = Recorder()
@@ -0,0 +1,306 @@
+"""
+Content-addressed store for the full-size Imagen masters.
+
+The store is what git tracks: each master exactly once, under the
+SHA-256 of its bytes, plus which (event, prompt) it was generated for:
+
+    masters/objects/ab/abcdef....png   losslessly recompressed blob
+    masters/index.json                 (event id, prompt hash) -> blob
+
+generated_images/ is a gitignored working copy under the current
+`{id}_{title}.png` names, which every other tool reads. After cloning,
+`checkout` creates it; after generating, `ingest` and commit masters/.
+A regenerated image adds one blob and a renamed title adds nothing, and
+the blob of a superseded prompt stays reachable from its index entry
+until `gc --prune`. Per-machine stat data (which working file holds
+which blob) lives in .cache/, not in the committed index.
+
+Commands:
+
+  ingest    recompress every PNG in generated_images/ (in a process pool,
+            zlib level 9 with Pillow's optimize pass) with its EXIF and text
+            chunks stripped and moved into the index, and file it under the
+            event id and the prompt hash the generation ledger recorded for
+            it (or the event's current prompt hash for pre-ledger files).
+            Unchanged files are skipped by size + mtime.
+  checkout  write generated_images/{id}_{title}.png for every event from
+            the blob for its current prompt (a copy, so later writes there
+            can't touch the store); --clean removes PNGs there that no
+            event maps to
+  gc        delete blobs no index entry references; --prune first drops
+            entries for prompts an event no longer uses
+
+Usage:
+    python master_store.py ingest [--jobs N]
+    python master_store.py checkout [--clean]
+    python master_store.py gc [--prune] [--dry-run]
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from asset_names import event_stem, stem_event_id
+from event_store import EventStore
+from fileio import load_json, write_json
+
+# ================= CONFIGURATION =================
+INPUT_DIR = "generated_images"
+STORE_DIR = "masters"
+INDEX_FILE = os.path.join(STORE_DIR, "index.json")
+SOURCES_FILE = os.path.join(".cache", "master_sources.json")  # local stat cache
+JSON_FILE = "src/data_with_prompts.json"
+# =================================================
+
+
+def blob_path(sha256, store_dir=STORE_DIR):
+    return os.path.join(store_dir, "objects", sha256[:2], sha256 + ".png")
+
+
+def entry_key(event_id, phash):
+    return f"{event_id}:{phash}"
+
+
+def load_index(path=INDEX_FILE, sources_path=SOURCES_FILE):
+    """The committed index, with this machine's "sources" stat cache merged in."""
+    index = load_json(path, {"blobs": {}, "entries": {}})
+    index.pop("sources", None)  # indexes written before the split
+    index["sources"] = load_json(sources_path, {})
+    return index
+
+
+def save_index(index, path=INDEX_FILE, sources_path=SOURCES_FILE):
+    write_json({k: v for k, v in index.items() if k != "sources"}, path, indent=2)
+    write_json(index["sources"], sources_path, indent=2)
+
+
+def current_prompt_hashes(json_file=JSON_FILE):
+    """{event_id: (stem, prompt hash)} for the prompts image_generator would send now."""
+    from generation_ledger import prompt_hash
+    from image_generator import GENERATION_SETTINGS, MODEL_NAME, build_prompt
+
+    return {
+        event.id: (event_stem(event),
+                   prompt_hash(build_prompt(event), model=MODEL_NAME, **GENERATION_SETTINGS))
+        for event in EventStore.load(json_file).events
+    }
+
+
+def ledger_prompt_hashes(ledger_file):
+    """{output filename: prompt hash} for every image the ledger recorded as generated."""
+    from generation_ledger import GenerationLedger
+
+    if not os.path.exists(ledger_file):
+        return {}
+    ledger = GenerationLedger(ledger_file)
+    try:
+        return {os.path.basename(row["output_path"]): row["prompt_hash"]
+                for row in sorted(ledger.rows.values(), key=lambda r: r["updated_at"])
+                if row["status"] == "generated" and row["output_path"]}
+    finally:
+        ledger.close()
+
+
+def recompress(path, store_dir=STORE_DIR):
+    """
+    Worker: re-encode one PNG losslessly without its metadata, write the
+    blob if the store doesn't have it yet, and return what the index needs.
+    """
+    with Image.open(path) as img:
+        img.load()
+        metadata = {"text": dict(getattr(img, "text", {}))}
+        if "exif" in img.info:
+            metadata["exif"] = base64.b64encode(img.info["exif"]).decode("ascii")
+        buf = io.BytesIO()
+        img.save(buf, "PNG", optimize=True, icc_profile=img.info.get("icc_profile"))
+        size = img.size
+    data = buf.getvalue()
+    sha256 = hashlib.sha256(data).hexdigest()
+    target = blob_path(sha256, store_dir)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+    return {"sha256": sha256, "bytes": len(data), "source_bytes": os.path.getsize(path),
+            "width": size[0], "height": size[1], "metadata": metadata}
+
+
+def ingest(index, ledger_file, jobs=None, input_dir=INPUT_DIR, store_dir=STORE_DIR):
+    """Store every changed PNG in input_dir and point its (event, prompt) entry at it."""
+    current = current_prompt_hashes()
+    from_ledger = ledger_prompt_hashes(ledger_file)
+
+    todo = []
+    with os.scandir(input_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not entry.name.lower().endswith(".png") or not entry.is_file():
+                continue
+            event_id = stem_event_id(os.path.splitext(entry.name)[0])
+            if event_id is None:
+                print(f"  ? {entry.name}: no event id, skipped")
+                continue
+            st = entry.stat()
+            seen = index["sources"].get(entry.name)
+            if seen and [seen["size"], seen["mtime_ns"]] == [st.st_size, st.st_mtime_ns] \
+                    and os.path.exists(blob_path(seen["blob"], store_dir)):
+                continue
+            phash = from_ledger.get(entry.name) or current.get(event_id, (None, None))[1]
+            if phash is None:
+                print(f"  ? {entry.name}: event {event_id} is not in {JSON_FILE}, skipped")
+                continue
+            todo.append((entry.name, event_id, phash, st))
+
+    if not todo:
+        print("Store up to date.")
+        return 0
+    print(f"Ingesting {len(todo)} images into {store_dir}/")
+    saved = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        paths = [os.path.join(input_dir, name) for name, *_ in todo]
+        results = pool.map(recompress, paths, [store_dir] * len(paths))
+        for (name, event_id, phash, st), blob in zip(todo, results):
+            sha256 = blob.pop("sha256")
+            index["blobs"][sha256] = blob
+            index["entries"][entry_key(event_id, phash)] = {
+                "event_id": event_id, "prompt_hash": phash, "blob": sha256, "file": name,
+                "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            index["sources"][name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                      "blob": sha256}
+            saved += blob["source_bytes"] - blob["bytes"]
+            print(f"  ✓ {name:55s} {blob['source_bytes'] // 1024:>6d}KB → "
+                  f"{blob['bytes'] // 1024:>6d}KB  {sha256[:12]}")
+    print(f"Recompression saved {saved / (1024 * 1024):.1f}MB")
+    return len(todo)
+
+
+def copy_blob(src, dst):
+    """
+    Always a copy, never a hard link: generate and candidate selection
+    overwrite PNGs in generated_images/ in place, which would rewrite the
+    shared blob and break its content address.
+    """
+    tmp = dst + ".tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def is_checked_out(path, blob, seen, source):
+    """path still holds the bytes checkout wrote there (and isn't a link to the blob)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (seen is not None and seen["blob"] == blob
+            and [seen["size"], seen["mtime_ns"]] == [st.st_size, st.st_mtime_ns]
+            and not os.path.samefile(path, source))
+
+
+def checkout(index, clean=False, input_dir=INPUT_DIR, store_dir=STORE_DIR):
+    """Materialise each event's current master under its current filename."""
+    current = current_prompt_hashes()
+    wanted = set()
+    written = missing = 0
+    for event_id, (stem, phash) in sorted(current.items()):
+        entry = index["entries"].get(entry_key(event_id, phash))
+        if not entry:
+            missing += 1
+            continue
+        name = stem + ".png"
+        wanted.add(name)
+        path = os.path.join(input_dir, name)
+        source = blob_path(entry["blob"], store_dir)
+        if is_checked_out(path, entry["blob"], index["sources"].get(name), source):
+            continue
+        copy_blob(source, path)
+        st = os.stat(path)
+        index["sources"][name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                  "blob": entry["blob"]}
+        written += 1
+
+    removed = 0
+    if clean:
+        for name in os.listdir(input_dir):
+            if name.lower().endswith(".png") and name not in wanted:
+                os.remove(os.path.join(input_dir, name))
+                index["sources"].pop(name, None)
+                removed += 1
+    print(f"Checked out {written} masters into {input_dir}/ ({len(wanted) - written} already "
+          f"current, {missing} events not in the store, {removed} stale files removed)")
+
+
+def gc(index, prune=False, dry_run=False, store_dir=STORE_DIR):
+    """Delete unreferenced blobs; with prune, entries for superseded prompts first."""
+    entries = index["entries"]
+    if prune:
+        live = {entry_key(event_id, phash) for event_id, (_, phash)
+                in current_prompt_hashes().items()}
+        entries = {key: entry for key, entry in entries.items() if key in live}
+        print(f"{'Would prune' if dry_run else 'Pruned'} "
+              f"{len(index['entries']) - len(entries)} superseded entries")
+
+    referenced = {entry["blob"] for entry in entries.values()}
+    freed = count = 0
+    for root, _, files in os.walk(os.path.join(store_dir, "objects")):
+        for name in files:
+            sha256 = name.split(".", 1)[0]
+            if sha256 in referenced:
+                continue
+            path = os.path.join(root, name)
+            freed += os.path.getsize(path)
+            count += 1
+            if not dry_run:
+                os.remove(path)
+    print(f"{'Would delete' if dry_run else 'Deleted'} {count} unreferenced blobs "
+          f"({freed / (1024 * 1024):.1f}MB)")
+
+    if not dry_run:
+        index["entries"] = entries
+        index["blobs"] = {sha: b for sha, b in index["blobs"].items() if sha in referenced}
+        index["sources"] = {name: s for name, s in index["sources"].items()
+                            if s["blob"] in referenced}
+
+
+def main(argv=None):
+    from generation_ledger import LEDGER_FILE
+
+    parser = argparse.ArgumentParser(description="Content-addressed store for master PNGs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("ingest", help="recompress and store generated PNGs")
+    p.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--ledger", default=LEDGER_FILE)
+    p = commands.add_parser("checkout", help="write current masters into generated_images/")
+    p.add_argument("--clean", action="store_true",
+                   help="remove PNGs that no current event maps to")
+    p = commands.add_parser("gc", help="delete blobs no entry references")
+    p.add_argument("--prune", action="store_true",
+                   help="first drop entries for prompts events no longer use")
+    p.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    index = load_index()
+    if args.command == "ingest":
+        ingest(index, args.ledger, jobs=args.jobs)
+    elif args.command == "checkout":
+        checkout(index, clean=args.clean)
+    else:
+        gc(index, prune=args.prune, dry_run=args.dry_run)
+    save_index(index)
+
+    total = sum(b["bytes"] for b in index["blobs"].values())
+    print(f"{len(index['entries'])} entries, {len(index['blobs'])} blobs, "
+          f"{total / (1024 * 1024):.1f}MB in {STORE_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,84 @@
 """
-Converts and optimizes generated Imagen PNGs to WebP for the webapp.
-Resizes to 800x600 (2x retina for the modal image area) at 80% quality.
-Outputs to public/images/ for use by the game.
+Converts and optimizes generated Imagen PNGs (and the sound effects) for
+the webapp.
+Each source is decoded once and resized from the largest width down to the
+smallest (1200/800/400 px, 4:3), writing AVIF, WebP and a JPEG fallback at
+every width. The 800x600 WebP keeps the original `{id}_{title}.webp` name;
+other variants are `{id}_{title}-{width}w.{ext}`.
+Outputs to public/images/ for use by the game, plus src/image_variants.json,
+the srcset map read by src/main.js.
+
+Usage:
+    python optimize_images.py [--jobs N] [--force] [--low-memory]
+                              [--target-ssim 0.95] [--budget-kb 60]
+
+Images are fanned out over a process pool (one worker per core by
+default); results are printed in filename order as they complete.
+
+public/images/.manifest.json records the source size, mtime, SHA-256 and
+encoder settings behind every output, so unchanged PNGs are skipped on the
+next run. Pass --force to re-encode everything.
+
+Every image also gets a 16x12 blurred placeholder (a ~100 byte WebP data
+URI, averaged with NumPy from the smallest variant in the same decode
+pass) inlined into src/image_variants.json. --atlas additionally tiles a
+160x120 thumbnail of every event into one sheet per level,
+public/images/atlas/level-N.webp, with each event's offset in the map.
+
+--target-ssim / --budget-kb switch from the fixed QUALITY to a per-image
+binary search: probe encodes of the 800x600 WebP are scored against the
+unencoded 800x600 greyscale with a NumPy SSIM over overlapping Gaussian
+windows, and the lowest quality that reaches the SSIM target (capped by
+the highest that fits the byte budget) is used for every variant,
+including the 1200px ones, which are never probed. On the current masters
+QUALITY 80 scores 0.915-0.961 (median 0.947), so --target-ssim 0.95 is
+about today's quality on average: lower for flat images, higher for
+detailed ones. The chosen quality is cached in the manifest with the
+source hash, so later builds of the same source skip the search.
+
+Sound effects get the same treatment: every .wav/.mp3 in public/ is
+trimmed of leading/trailing silence, loudness-normalised (EBU R128) and
+transcoded by ffmpeg, one process per file in parallel, to Opus/OGG and
+AAC/M4A in public/audio/. They are tracked in the same manifest (keys
+"audio:<file>"), and src/audio_variants.json lets src/main.js pick the
+best format the browser plays. Audio is skipped if ffmpeg isn't on PATH
+or with --no-audio.
+
+image_generator.py --publish runs the same conversion through a Publisher
+while it generates: each new image's PNG bytes go from memory to a bounded
+process pool and are recorded in the manifest, so this script later skips
+them.
+
+Finally every image and sound in public/ is copied to a content-hashed
+name under public/static/ and src/asset_urls.json is rewritten, so the
+game requests URLs that can be cached forever (see static_assets.py;
+--no-fingerprint skips it).
+
+--trace FILE writes per-stage JSON-lines timings (decode, resize, encode,
+hash) and --profile STAGE cProfiles a stage, including inside workers;
+see instrumentation.py.
 """
 
+import argparse
+import base64
+import hashlib
+import io
+import multiprocessing
 import os
-from PIL import Image
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+from PIL import Image, features
+
+from event_store import EventStore
+from fileio import file_sha256, load_json, write_json, write_json_if_changed
+from instrumentation import recorder
+from static_assets import fingerprint
 
 # ================= CONFIGURATION =================
 INPUT_DIR = "generated_images"
@@ -13,80 +86,781 @@ OUTPUT_DIR = "public/images"
 TARGET_WIDTH = 800
 TARGET_HEIGHT = 600
 QUALITY = 80
+AVIF_QUALITY = 60  # AVIF holds up at lower settings than WebP
+WIDTHS = [1200, 800, 400]  # largest first; each is resized from the previous
+FORMATS = ["avif", "webp", "jpeg"]  # in <picture> preference order
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, ".manifest.json")
+VARIANTS_FILE = "src/image_variants.json"
+REDUCING_GAP = 2.0  # --low-memory: box-reduce until within 2x of the target
+LOW_MEMORY_TASKS_PER_CHILD = 8
+PLACEHOLDER_SIZE = (16, 12)  # LQIP grid, upscaled (and so blurred) by the browser
+ATLAS_CELL = (160, 120)      # --atlas thumbnail size
+ATLAS_COLUMNS = 8
+ATLAS_DIR = "atlas"          # under OUTPUT_DIR
+DATA_FILE = "src/data.json"  # level membership for --atlas
+TUNE_RANGE = (40, 95)        # quality search bounds
+SSIM_SIGMA = 1.5              # Gaussian SSIM window (Wang et al. 2004)
+SSIM_RADIUS = 5
+SSIM_METRIC = "gaussian-1.5@800x600"  # recorded with tuned qualities; change to re-search
+TUNE_METHOD = 4              # WebP effort for probe encodes; outputs keep method=6
+AUDIO_DIR = "public"
+AUDIO_OUTPUT_DIR = "public/audio"
+AUDIO_URL = "audio/"         # AUDIO_OUTPUT_DIR relative to the site base
+AUDIO_VARIANTS_FILE = "src/audio_variants.json"
+AUDIO_SOURCES = (".wav", ".mp3")
+AUDIO_FORMATS = {            # in client preference order: (extension, ffmpeg codec args)
+    "opus": ("ogg", ["-c:a", "libopus", "-b:a", "64k"]),
+    "aac": ("m4a", ["-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart"]),
+}
+LOUDNORM = "loudnorm=I=-16:TP=-1.5:LRA=11"
+SILENCE_DB = -60             # trim leading/trailing audio quieter than this
 # =================================================
 
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
 
-def optimize_image(input_path, output_path):
-    """Resize and convert a single image to WebP."""
-    try:
-        with Image.open(input_path) as img:
-            # Convert to RGB if necessary (e.g. RGBA PNGs)
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
 
-            # Resize with high-quality downsampling
-            img = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.LANCZOS)
+def available_formats():
+    """FORMATS minus AVIF when this Pillow build can't encode it."""
+    formats = list(FORMATS)
+    if "avif" in formats and not features.check("avif"):
+        formats.remove("avif")
+    return formats
+
+
+def encoder_settings(tune=None):
+    """Everything that affects the bytes of an output; a change forces a re-encode."""
+    return {"width": TARGET_WIDTH, "height": TARGET_HEIGHT, "quality": QUALITY,
+            "avif_quality": AVIF_QUALITY, "widths": sorted(WIDTHS, reverse=True),
+            "formats": available_formats(), "placeholder": list(PLACEHOLDER_SIZE),
+            "tune": tune, **({"ssim_metric": SSIM_METRIC} if tune else {})}
+
+
+def variant_name(stem, width, fmt):
+    """
+    The default 800px WebP keeps the legacy name so old links keep working;
+    static_assets prune leaves it in the build for the same reason.
+    """
+    if width == TARGET_WIDTH and fmt == "webp":
+        return f"{stem}.webp"
+    return f"{stem}-{width}w.{EXTENSIONS[fmt]}"
+
+
+def save_variant(img, path, fmt, quality=QUALITY):
+    """AVIF keeps its offset below the WebP/JPEG quality when that is tuned."""
+    if fmt == "avif":
+        img.save(path, "AVIF", quality=max(1, quality - (QUALITY - AVIF_QUALITY)), speed=6)
+    elif fmt == "jpeg":
+        img.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(path, "WEBP", quality=quality, method=6)
+
+
+def load_manifest(path=MANIFEST_FILE):
+    return load_json(path)
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    write_json(manifest, path, indent=2)
+
+
+def is_up_to_date(entry, input_path, settings, output_dir=None):
+    """
+    Cheap checks first: settings, output presence, then size + mtime.
+    Only when the stat differs is the source hashed; a matching hash
+    (e.g. after a fresh checkout) refreshes the recorded mtime in place.
+    """
+    if not entry or entry.get("settings") != settings or not entry.get("outputs"):
+        return False
+    if not all(os.path.exists(os.path.join(output_dir or OUTPUT_DIR, v["file"]))
+               for v in entry.get("outputs", [])):
+        return False
+    st = os.stat(input_path)
+    if st.st_size != entry.get("size"):
+        return False
+    if st.st_mtime_ns == entry.get("mtime_ns"):
+        return True
+    if file_sha256(input_path) == entry.get("sha256"):
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+    return False
+
 
-            # Save as WebP
-            img.save(output_path, "WEBP", quality=QUALITY, method=6)
+def decode_low_memory(input_path, width, height, source=None):
+    """
+    Decode a source straight down to (width, height), releasing the
+    full-size pixels before returning.
 
-            # File size comparison
-            input_size = os.path.getsize(input_path)
-            output_size = os.path.getsize(output_path)
-            reduction = (1 - output_size / input_size) * 100
+    draft() lets JPEG-style decoders scale while decoding (a no-op for PNG),
+    reducing_gap box-reduces by an integer factor before the Lanczos pass,
+    and RGB/L sources are never copied just to change mode; RGBA is only
+    flattened once it is small. source, if given, is read instead of
+    input_path.
+    """
+    with recorder.span("decode", file=os.path.basename(input_path), low_memory=True), \
+            Image.open(source or input_path) as src:
+        src.draft("RGB", (width, height))
+        if src.mode == "P":
+            src = src.convert("RGBA")
+        img = src.resize((width, height), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+    if img.mode == "RGBA":
+        img = img.convert("RGB")
+    return img
 
-            print(f"  ✓ {os.path.basename(output_path):50s}  "
-                  f"{input_size // 1024:>6d}KB → {output_size // 1024:>4d}KB  "
-                  f"({reduction:.0f}% smaller)")
-            return True
+
+def write_variants(img, stem, widths, formats, quality=QUALITY):
+    """
+    Resize with high-quality downsampling, each width from the previous
+    (larger) one, and save every format at each width. Returns the
+    variants written and the smallest image, for the previews.
+    """
+    outputs = []
+    for width in widths:
+        height = round(width * TARGET_HEIGHT / TARGET_WIDTH)
+        if img.size != (width, height):
+            with recorder.span("resize", width=width):
+                img = img.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = variant_name(stem, width, fmt)
+            path = os.path.join(OUTPUT_DIR, name)
+            with recorder.span("encode", width=width, format=fmt):
+                save_variant(img, path, fmt, quality)
+            outputs.append({"file": name, "width": width, "format": fmt,
+                            "bytes": os.path.getsize(path)})
+    return outputs, img
+
+
+def block_mean(pixels, cols, rows):
+    """Average (H, W, C) pixels down to (rows, cols, C) in one reshape."""
+    h, w, c = pixels.shape
+    bh, bw = h // rows, w // cols
+    return pixels[:bh * rows, :bw * cols].reshape(rows, bh, cols, bw, c).mean(axis=(1, 3))
+
+
+def make_placeholder(img):
+    """Block-averaged PLACEHOLDER_SIZE WebP (or smaller, for a tinier image) as a data URI."""
+    # Every block needs at least one pixel, or its mean is NaN
+    cols, rows = min(PLACEHOLDER_SIZE[0], img.width), min(PLACEHOLDER_SIZE[1], img.height)
+    grid = block_mean(np.asarray(img, dtype=np.float32), cols, rows)
+    buf = io.BytesIO()
+    Image.fromarray(grid.round().astype(np.uint8)).save(buf, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def gaussian_blur(x, sigma=SSIM_SIGMA, radius=SSIM_RADIUS):
+    """Separable Gaussian filter over the valid region (no padding) of a 2-D array."""
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    taps = (taps / taps.sum()).astype(np.float32)
+    n = 2 * radius + 1
+    rows = sum(t * x[i:x.shape[0] - n + 1 + i] for i, t in enumerate(taps))
+    return sum(t * rows[:, i:x.shape[1] - n + 1 + i] for i, t in enumerate(taps))
+
+
+def ssim(a, b):
+    """Mean SSIM of two greyscale float arrays over overlapping Gaussian windows."""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_a, mu_b = gaussian_blur(a), gaussian_blur(b)
+    var_a = gaussian_blur(a * a) - mu_a ** 2
+    var_b = gaussian_blur(b * b) - mu_b ** 2
+    cov = gaussian_blur(a * b) - mu_a * mu_b
+    s = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / (
+        (mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(s.mean())
+
+
+def search_quality(img, target_ssim=None, budget_kb=None):
+    """
+    Binary-search TUNE_RANGE on probe encodes of the default-size WebP:
+    the lowest quality whose SSIM reaches target_ssim, capped by the
+    highest whose size fits budget_kb. Returns (quality, ssim, bytes).
+    """
+    probe = img.convert("RGB")
+    if probe.size != (TARGET_WIDTH, TARGET_HEIGHT):
+        probe = probe.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.LANCZOS)
+    # Scored at the full 800x600: shrinking further would hide the artifacts
+    reference = np.asarray(probe.convert("L"), dtype=np.float32)
+    probes = {}
+
+    def measure(q):
+        if q not in probes:
+            buf = io.BytesIO()
+            probe.save(buf, "WEBP", quality=q, method=TUNE_METHOD)
+            size = buf.tell()
+            buf.seek(0)
+            with Image.open(buf) as decoded:
+                grey = np.asarray(decoded.convert("L"), dtype=np.float32)
+            probes[q] = (ssim(reference, grey), size)
+        return probes[q]
+
+    def first(lo, hi, ok):
+        """Smallest q in [lo, hi] with ok(q), assuming ok is monotone; hi + 1 if none."""
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if ok(mid):
+                hi = mid - 1
+            else:
+                lo = mid + 1
+        return lo
+
+    lo, hi = TUNE_RANGE
+    quality = hi
+    if target_ssim is not None:
+        quality = min(hi, first(lo, hi, lambda q: measure(q)[0] >= target_ssim))
+    if budget_kb is not None:
+        over = first(lo, hi, lambda q: measure(q)[1] > budget_kb * 1024)
+        quality = max(lo, min(quality, over - 1))
+    return (quality, *measure(quality))
+
+
+def add_previews(result, img, atlas):
+    """Placeholder (and atlas cell) from the already-decoded smallest variant."""
+    with recorder.span("placeholder"):
+        if img.mode != "RGB":  # greyscale sources are left as "L" for the encoders
+            img = img.convert("RGB")
+        result["placeholder"] = make_placeholder(img)
+        if atlas:
+            result["cell"] = np.asarray(img.resize(ATLAS_CELL, Image.LANCZOS))
+
+
+def optimize_image(input_path, stem, formats=None, low_memory=False, atlas=False,
+                   tune=None, quality=None, data=None):
+    """
+    Decode a PNG once and write every width x format variant for it.
+    data, if given, holds the PNG already in memory and is decoded instead
+    of reading input_path.
+
+    With tune ({"ssim": ..., "budget_kb": ...}) and no quality given, the
+    quality is searched for first; pass a previously chosen quality to
+    skip the search.
+
+    Returns a result dict with the input path, the variants written
+    ({"file", "width", "format", "bytes"}), their total size, the quality
+    used and the placeholder data URI (plus the atlas cell pixels if atlas
+    is set); "error" holds the message if the conversion failed.
+    """
+    formats = formats or available_formats()
+    result = {"input": input_path, "output": variant_name(stem, TARGET_WIDTH, "webp"),
+              "outputs": [], "input_size": 0, "output_size": 0, "quality": quality,
+              "error": None}
+
+    def choose_quality(img):
+        if result["quality"] is None:
+            if not tune:
+                result["quality"] = QUALITY
+                return
+            with recorder.span("tune"):
+                result["quality"], result["ssim"], _ = search_quality(
+                    img, tune.get("ssim"), tune.get("budget_kb"))
+    try:
+        with Image.open(io.BytesIO(data) if data is not None else input_path) as img:
+            # Never upscale past the source; one native-width variant if it's
+            # narrower than every configured width
+            widths = [w for w in sorted(WIDTHS, reverse=True) if w <= img.width] or [img.width]
+
+            if not low_memory:
+                with recorder.span("decode", file=os.path.basename(input_path)):
+                    img.load()
+                    # Convert to RGB if necessary (e.g. RGBA PNGs)
+                    if img.mode in ("RGBA", "P"):
+                        img = img.convert("RGB")
+                choose_quality(img)
+                result["outputs"], smallest = write_variants(img, stem, widths, formats,
+                                                             result["quality"])
+                add_previews(result, smallest, atlas)
+
+        if low_memory:
+            height = round(widths[0] * TARGET_HEIGHT / TARGET_WIDTH)
+            img = decode_low_memory(input_path, widths[0], height,
+                                    io.BytesIO(data) if data is not None else None)
+            choose_quality(img)
+            result["outputs"], smallest = write_variants(img, stem, widths, formats,
+                                                         result["quality"])
+            add_previews(result, smallest, atlas)
+
+        result["input_size"] = len(data) if data is not None else os.path.getsize(input_path)
+        result["output_size"] = sum(v["bytes"] for v in result["outputs"])
 
     except Exception as e:
-        print(f"  ✗ {os.path.basename(input_path)}: {e}")
+        result["error"] = str(e)
+    return result
+
+
+def _optimize_job(job):
+    """
+    Worker entry point: stat and hash the source for the manifest, then
+    convert. options holds optimize_image keyword arguments, plus "cached":
+    the {"sha256", "tune", "quality"} of the previous build, whose quality
+    is reused when neither the source nor the tuning target changed.
+    Stage timings recorded in a worker process ride back in
+    result["spans"].
+
+    With options["data"] (the Publisher) the in-memory PNG is hashed
+    instead of re-reading the file, as long as the archival copy on disk
+    has the same size; Vertex's save() can add metadata, and the manifest
+    must describe the file on disk.
+    """
+    input_path, stem, options = job
+    options = dict(options)
+    cached = options.pop("cached", None)
+    data = options.get("data")
+    st = os.stat(input_path)
+    with recorder.span("hash"):
+        if data is not None and len(data) == st.st_size:
+            sha256 = hashlib.sha256(data).hexdigest()
+        else:
+            sha256 = file_sha256(input_path)
+    if cached and options.get("tune") and cached["sha256"] == sha256 \
+            and cached["tune"] == options["tune"] and cached.get("metric") == SSIM_METRIC:
+        options["quality"] = cached["quality"]
+    with recorder.span("optimize_image", file=os.path.basename(input_path)):
+        result = optimize_image(input_path, stem, **options)
+    result["input_size"] = st.st_size
+    result["mtime_ns"] = st.st_mtime_ns
+    result["sha256"] = sha256
+    result["spans"] = recorder.drain()
+    return result
+
+
+def report(result):
+    """Print one result line; returns True if the image converted."""
+    if result["error"]:
+        print(f"  ✗ {os.path.basename(result['input'])}: {result['error']}")
         return False
 
+    # File size comparison
+    input_size, output_size = result["input_size"], result["output_size"]
+    reduction = (1 - output_size / input_size) * 100
+    tuned = f", q{result['quality']}" if result.get("quality", QUALITY) != QUALITY else ""
+    print(f"  ✓ {result['output']:50s}  "
+          f"{input_size // 1024:>6d}KB → {output_size // 1024:>4d}KB  "
+          f"({reduction:.0f}% smaller, {len(result['outputs'])} variants{tuned})")
+    return True
+
+
+def manifest_entry(result, settings, tune=None):
+    """The manifest record for one converted image or audio file."""
+    entry = {
+        "source": os.path.basename(result["input"]),
+        "size": result["input_size"],
+        "mtime_ns": result["mtime_ns"],
+        "sha256": result["sha256"],
+        "settings": settings,
+        "outputs": result["outputs"],
+    }
+    if "placeholder" in result:
+        entry["placeholder"] = result["placeholder"]
+    if tune:
+        entry["tuned"] = {"tune": tune, "quality": result["quality"], "metric": SSIM_METRIC}
+    return entry
+
+
+def list_sources(input_dir=INPUT_DIR):
+    """Sorted PNG filenames in input_dir and their manifest keys."""
+    png_files = sorted(f for f in os.listdir(input_dir) if f.lower().endswith(".png"))
+    # Variants keep the same name; the default WebP is the manifest key
+    return png_files, [variant_name(os.path.splitext(f)[0], TARGET_WIDTH, "webp")
+                       for f in png_files]
+
+
+class Publisher:
+    """
+    Encode freshly generated images from memory while generation goes on
+    (image_generator.py --publish). submit() blocks while max_pending
+    images are already queued, so a burst of fast responses can't pile up
+    PNG bytes; each finished image is recorded in the manifest exactly as
+    main() would record the archival PNG, so the next full run skips it.
+    low_memory, atlas and tune mean what --low-memory, --atlas and
+    --target-ssim/--budget-kb do for main(). input_dir is where the
+    generator writes its PNGs (its --output-dir); close() lists it
+    alongside INPUT_DIR for the srcset map and, unless fingerprint_assets
+    is off, refreshes the fingerprinted copies as main() does.
+
+    Workers are spawned, not forked: submit() runs on the generator's
+    worker threads, and forking a multithreaded process can copy a lock
+    (the recorder's, SQLite's) in its held state into the child.
+    """
+
+    def __init__(self, workers=None, max_pending=None, low_memory=False, atlas=False,
+                 tune=None, input_dir=INPUT_DIR, fingerprint_assets=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = threading.BoundedSemaphore(max_pending or 2 * self.workers)
+        self.lock = threading.Lock()
+        self.manifest = load_manifest()
+        self.tune = tune
+        self.input_dir = input_dir
+        self.fingerprint_assets = fingerprint_assets
+        self.settings = encoder_settings(tune)
+        self.options = {"low_memory": low_memory, "atlas": atlas, "tune": tune}
+        self.cells = {}
+        self.counts = {"published": 0, "failed": 0}
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=LOW_MEMORY_TASKS_PER_CHILD if low_memory else None)
+
+    def submit(self, data, png_path):
+        """Queue one image: data is its PNG bytes, png_path the archival copy on disk."""
+        with recorder.span("publish_wait"):
+            self.slots.acquire()
+        stem = os.path.splitext(os.path.basename(png_path))[0]
+        options = {**self.options, "data": data}
+        with self.lock:
+            previous = self.manifest.get(variant_name(stem, TARGET_WIDTH, "webp"), {})
+        if previous.get("tuned"):
+            options["cached"] = {"sha256": previous["sha256"], **previous["tuned"]}
+        future = self.pool.submit(_optimize_job, (png_path, stem, options))
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.slots.release()
+        result = future.result()
+        recorder.merge(result.pop("spans", []))
+        with self.lock:
+            if report(result):
+                self.manifest[result["output"]] = manifest_entry(result, self.settings, self.tune)
+                if "cell" in result:
+                    self.cells[result["output"]] = result["cell"]
+                self.counts["published"] += 1
+            else:
+                self.counts["failed"] += 1
+
+    def close(self):
+        """Wait for the queue to drain, then save the manifest, atlases, srcset map and URLs."""
+        self.pool.shutdown(wait=True)
+        entries = sorted({key for directory in {self.input_dir, INPUT_DIR}
+                          if os.path.isdir(directory) for key in list_sources(directory)[1]})
+        atlas = build_atlases(self.manifest, entries, self.cells) if self.options["atlas"] else None
+        save_manifest(self.manifest)
+        if write_json_if_changed(VARIANTS_FILE, build_variant_map(self.manifest, entries, atlas)):
+            print(f"Wrote {VARIANTS_FILE}")
+        print(f"Published {self.counts['published']} images to {OUTPUT_DIR}/ "
+              f"({self.counts['failed']} failed)")
+        if self.fingerprint_assets:
+            fingerprint(jobs=self.workers)
+
+
+def audio_key(filename):
+    return f"audio:{filename}"
+
+
+def audio_settings():
+    return {"formats": {fmt: codec for fmt, (_, codec) in AUDIO_FORMATS.items()},
+            "loudnorm": LOUDNORM, "silence_db": SILENCE_DB, "names": "source.ext"}
+
+
+def audio_output_name(name, ext):
+    """Keep the source extension, so X.wav and X.mp3 don't both write X.ogg."""
+    return f"{name}.{ext}"
+
+
+def audio_filter():
+    """Trim silence at both ends (silenceremove only trims the start), then normalise."""
+    trim = f"silenceremove=start_periods=1:start_threshold={SILENCE_DB}dB"
+    return ",".join([trim, "areverse", trim, "areverse", LOUDNORM])
+
+
+def transcode_audio(input_path):
+    """
+    Write every AUDIO_FORMATS variant of one sound with ffmpeg. Returns a
+    result dict shaped like optimize_image's, ready for manifest_entry().
+    """
+    name = os.path.basename(input_path)
+    result = {"input": input_path, "output": audio_key(name), "outputs": [],
+              "input_size": 0, "output_size": 0, "error": None}
+    try:
+        for fmt, (ext, codec) in AUDIO_FORMATS.items():
+            file = audio_output_name(name, ext)
+            path = os.path.join(AUDIO_OUTPUT_DIR, file)
+            tmp = f"{path}.tmp.{ext}"  # ffmpeg picks the muxer from the extension
+            with recorder.span("transcode", file=name, format=fmt):
+                subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", input_path, "-vn",
+                                "-map_metadata", "-1", "-af", audio_filter(), "-ar", "48000",
+                                *codec, tmp], check=True, capture_output=True, text=True)
+            os.replace(tmp, path)
+            result["outputs"].append({"file": file, "format": fmt,
+                                      "bytes": os.path.getsize(path)})
+        st = os.stat(input_path)
+        result["input_size"] = st.st_size
+        result["mtime_ns"] = st.st_mtime_ns
+        result["sha256"] = file_sha256(input_path)
+        result["output_size"] = sum(v["bytes"] for v in result["outputs"])
+    except subprocess.CalledProcessError as e:
+        lines = e.stderr.strip().splitlines()
+        result["error"] = lines[-1] if lines else str(e)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def build_audio_map(manifest, sources):
+    """
+    Variant URLs per original file name, relative to the site base:
+        {"Game start_crystal bowl.wav": {"opus": "audio/Game%20start_crystal%20bowl.wav.ogg", ...}}
+    """
+    audio = {}
+    for name in sources:
+        entry = manifest.get(audio_key(name))
+        if entry:
+            audio[name] = {v["format"]: AUDIO_URL + quote(v["file"]) for v in entry["outputs"]}
+    return audio
 
-def main():
+
+def optimize_audio(manifest, workers):
+    """
+    Transcode new or changed sounds in AUDIO_DIR. ffmpeg does the work in
+    its own processes, so a thread per file is enough to use every core.
+    """
+    sources = sorted(f for f in os.listdir(AUDIO_DIR) if f.lower().endswith(AUDIO_SOURCES))
+    if not sources:
+        return
+    if shutil.which("ffmpeg") is None:
+        print(f"\nffmpeg not found on PATH; {len(sources)} audio files left as they are")
+        return
+
+    settings = audio_settings()
+    todo = [f for f in sources
+            if not is_up_to_date(manifest.get(audio_key(f)), os.path.join(AUDIO_DIR, f),
+                                 settings, AUDIO_OUTPUT_DIR)]
+    if todo:
+        os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
+        print(f"\nTranscoding {len(todo)} audio files ({len(sources) - len(todo)} up to date) "
+              f"to {', '.join(AUDIO_FORMATS)}")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as pool:
+            for result in pool.map(transcode_audio, [os.path.join(AUDIO_DIR, f) for f in todo]):
+                if report(result):
+                    old = manifest.get(result["output"], {}).get("outputs", [])
+                    manifest[result["output"]] = manifest_entry(result, settings)
+                    # Outputs under a previous naming scheme
+                    for file in {v["file"] for v in old} - {v["file"] for v in result["outputs"]}:
+                        try:
+                            os.remove(os.path.join(AUDIO_OUTPUT_DIR, file))
+                        except FileNotFoundError:
+                            pass
+    else:
+        print(f"All {len(sources)} audio files up to date.")
+    if write_json_if_changed(AUDIO_VARIANTS_FILE, build_audio_map(manifest, sources)):
+        print(f"Wrote {AUDIO_VARIANTS_FILE}")
+
+
+def level_members(keys, data_file=DATA_FILE):
+    """[(level number, [manifest keys in data order])], 1-based like the HUD."""
+    by_id = {key.split("_", 1)[0]: key for key in keys}
+    levels = EventStore.load(data_file).levels
+    return [(level.index + 1, [by_id[str(e.id)] for e in level.events if str(e.id) in by_id])
+            for level in levels]
+
+
+def load_cell(entry):
+    """Atlas cell for an image converted in an earlier run, from its smallest output."""
+    smallest = min(entry["outputs"], key=lambda v: (v["width"], v["format"] != "webp"))
+    with Image.open(os.path.join(OUTPUT_DIR, smallest["file"])) as img:
+        return np.asarray(img.convert("RGB").resize(ATLAS_CELL, Image.LANCZOS))
+
+
+def compose_atlas(cells, columns):
+    """Tile (N, h, w, 3) cells row-major into one (rows*h, columns*w, 3) sheet."""
+    n, h, w, c = cells.shape
+    rows = -(-n // columns)
+    padded = np.zeros((rows * columns, h, w, c), dtype=np.uint8)
+    padded[:n] = cells
+    return padded.reshape(rows, columns, h, w, c).transpose(0, 2, 1, 3, 4).reshape(
+        rows * h, columns * w, c)
+
+
+def build_atlases(manifest, entries, cells):
+    """
+    Write one thumbnail sheet per level, rebuilt only when its members or
+    their sources changed (tracked in the manifest under the sheet's name).
+    Cells converted this run come from the workers; the rest are read back
+    from each image's smallest output. Returns {key: placement}.
+    """
+    os.makedirs(os.path.join(OUTPUT_DIR, ATLAS_DIR), exist_ok=True)
+    settings = {"cell": list(ATLAS_CELL), "columns": ATLAS_COLUMNS, "quality": QUALITY}
+    w, h = ATLAS_CELL
+    placements = {}
+    for level, keys in level_members([k for k in entries if k in manifest]):
+        if not keys:
+            continue
+        name = f"{ATLAS_DIR}/level-{level}.webp"
+        path = os.path.join(OUTPUT_DIR, name)
+        columns = min(ATLAS_COLUMNS, len(keys))
+        rows = -(-len(keys) // columns)
+        signature = {"members": [[k, manifest[k]["sha256"]] for k in keys], "settings": settings}
+        if manifest.get(name) != signature or not os.path.exists(path):
+            with recorder.span("atlas", level=level, images=len(keys)):
+                stack = np.stack([cells[k] if k in cells else load_cell(manifest[k]) for k in keys])
+                Image.fromarray(compose_atlas(stack, columns)).save(
+                    path, "WEBP", quality=QUALITY, method=6)
+            manifest[name] = signature
+            print(f"Wrote {path} ({len(keys)} thumbnails)")
+        for i, key in enumerate(keys):
+            placements[key] = {"src": f"images/{name}", "x": (i % columns) * w,
+                               "y": (i // columns) * h, "w": w, "h": h,
+                               "width": columns * w, "height": rows * h}
+    return placements
+
+
+def build_variant_map(manifest, entries, atlas=None):
+    """
+    srcset map keyed by event id (the filename prefix), with URLs relative
+    to the site base:
+        {"1": {"src": "images/1_The_Big_Bang.webp", "width": 800, "height": 600,
+               "srcset": {"avif": "images/1_The_Big_Bang-1200w.avif 1200w, ...", ...},
+               "placeholder": "data:image/webp;base64,...",
+               "atlas": {"src": "images/atlas/level-1.webp", "x": 160, "y": 0, ...}}}
+    """
+    atlas = atlas or {}
+    variants = {}
+    for key in entries:
+        entry = manifest.get(key)
+        if not entry or not entry.get("outputs"):
+            continue
+        # The legacy 800px WebP, or the widest WebP of a source narrower than that
+        default = next((v for v in entry["outputs"] if v["file"] == key), None) or max(
+            (v for v in entry["outputs"] if v["format"] == "webp"), key=lambda v: v["width"])
+        srcset = {}
+        for fmt in entry["settings"]["formats"]:
+            candidates = [v for v in entry["outputs"] if v["format"] == fmt]
+            srcset[fmt] = ", ".join(f"images/{quote(v['file'])} {v['width']}w"
+                                    for v in sorted(candidates, key=lambda v: v["width"]))
+        event_id = key.split("_", 1)[0]
+        variants[event_id] = {"src": f"images/{quote(default['file'])}",
+                              "width": default["width"],
+                              "height": round(default["width"] * TARGET_HEIGHT / TARGET_WIDTH),
+                              "srcset": srcset,
+                              "placeholder": entry.get("placeholder")}
+        if key in atlas:
+            variants[event_id]["atlas"] = atlas[key]
+    return variants
+
+
+def run_jobs(jobs, workers, low_memory=False):
+    """
+    Yield optimize_image results in input order, using a process pool if
+    workers > 1. In low-memory mode workers are recycled every few images
+    so allocator fragmentation can't ratchet up their RSS.
+    """
+    if workers <= 1:
+        yield from map(_optimize_job, jobs)
+        return
+    tasks_per_child = LOW_MEMORY_TASKS_PER_CHILD if low_memory else None
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=tasks_per_child) as pool:
+        yield from pool.map(_optimize_job, jobs)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert generated PNGs and sound effects for the web.")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: all cores; 1 = serial)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the manifest and re-encode every image")
+    parser.add_argument("--trace", help="append JSON-lines stage events to this file")
+    parser.add_argument("--profile", nargs="+", metavar="STAGE",
+                        help="cProfile these stages (decode, resize, encode, hash, ...)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="pre-shrink while decoding and recycle workers to bound peak RSS")
+    parser.add_argument("--atlas", action="store_true",
+                        help=f"also tile per-level thumbnail sheets into {OUTPUT_DIR}/{ATLAS_DIR}/")
+    parser.add_argument("--no-audio", action="store_true",
+                        help=f"skip transcoding the sounds in {AUDIO_DIR}/")
+    parser.add_argument("--no-fingerprint", action="store_true",
+                        help="skip the content-hashed copies and src/asset_urls.json")
+    parser.add_argument("--target-ssim", type=float,
+                        help=f"search each image's quality for this SSIM at {TARGET_WIDTH}px "
+                             f"(0.95 ~ the fixed {QUALITY}%%); used for every width")
+    parser.add_argument("--budget-kb", type=int,
+                        help=f"cap each image's {TARGET_WIDTH}px WebP at this size")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    recorder.configure(trace_path=args.trace, profile=args.profile)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Find all PNGs in input directory
-    png_files = sorted([
-        f for f in os.listdir(INPUT_DIR)
-        if f.lower().endswith(".png")
-    ])
+    png_files, entries = list_sources()
 
     if not png_files:
         print(f"No PNG files found in {INPUT_DIR}/")
-        return
 
-    print(f"Optimizing {len(png_files)} images")
-    print(f"  Source:  {INPUT_DIR}/")
-    print(f"  Output:  {OUTPUT_DIR}/")
-    print(f"  Size:    {TARGET_WIDTH}x{TARGET_HEIGHT}")
-    print(f"  Quality: {QUALITY}%")
-    print(f"  Format:  WebP\n")
+    previous = load_manifest()
+    manifest = {} if args.force else previous
+    tune = None
+    if args.target_ssim is not None or args.budget_kb is not None:
+        tune = {"ssim": args.target_ssim, "budget_kb": args.budget_kb}
+    settings = encoder_settings(tune)
+
+    jobs = []
+    for filename, key in zip(png_files, entries):
+        input_path = os.path.join(INPUT_DIR, filename)
+        stem = os.path.splitext(filename)[0]
+        if not is_up_to_date(manifest.get(key), input_path, settings):
+            options = {"low_memory": args.low_memory, "atlas": args.atlas, "tune": tune}
+            tuned = previous.get(key, {}).get("tuned")
+            if tuned:
+                options["cached"] = {"sha256": previous[key]["sha256"], **tuned}
+            jobs.append((input_path, stem, options))
 
+    skipped = len(png_files) - len(jobs)
     success = 0
     failed = 0
     total_input = 0
     total_output = 0
+    cells = {}
+    start = time.perf_counter()
 
-    for filename in png_files:
-        input_path = os.path.join(INPUT_DIR, filename)
-        # Change extension to .webp, keep the same name
-        webp_name = os.path.splitext(filename)[0] + ".webp"
-        output_path = os.path.join(OUTPUT_DIR, webp_name)
-
-        if optimize_image(input_path, output_path):
-            total_input += os.path.getsize(input_path)
-            total_output += os.path.getsize(output_path)
-            success += 1
+    if not jobs:
+        if png_files:
+            print(f"All {len(png_files)} images up to date.")
+    else:
+        workers = max(1, min(args.jobs, len(jobs)))
+        print(f"Optimizing {len(jobs)} images ({skipped} up to date)")
+        print(f"  Source:  {INPUT_DIR}/")
+        print(f"  Output:  {OUTPUT_DIR}/")
+        print(f"  Widths:  {', '.join(str(w) for w in settings['widths'])} "
+              f"(4:3, default {TARGET_WIDTH}x{TARGET_HEIGHT})")
+        if tune:
+            print(f"  Quality: searched in {TUNE_RANGE[0]}-{TUNE_RANGE[1]} for "
+                  + ", ".join(f"{k} {v}" for k, v in tune.items() if v is not None))
         else:
-            failed += 1
+            print(f"  Quality: {QUALITY}% (AVIF {AVIF_QUALITY}%)")
+        print(f"  Formats: {', '.join(settings['formats'])}")
+        print(f"  Jobs:    {workers}{' (low memory)' if args.low_memory else ''}\n")
+
+        for result in run_jobs(jobs, workers, args.low_memory):
+            recorder.merge(result.pop("spans", []))
+            if report(result):
+                total_input += result["input_size"]
+                total_output += result["output_size"]
+                success += 1
+                manifest[result["output"]] = manifest_entry(result, settings, tune)
+                if "cell" in result:
+                    cells[result["output"]] = result["cell"]
+            else:
+                failed += 1
+
+    if not args.no_audio:
+        optimize_audio(manifest, args.jobs)
+    atlas = build_atlases(manifest, entries, cells) if args.atlas else None
+    save_manifest(manifest)
+    if write_json_if_changed(VARIANTS_FILE, build_variant_map(manifest, entries, atlas)):
+        print(f"Wrote {VARIANTS_FILE}")
+    if not args.no_fingerprint:
+        fingerprint(jobs=args.jobs)
+    if not jobs:
+        recorder.close()
+        return
 
-    print(f"\nDone! {success} converted, {failed} failed")
+    elapsed = time.perf_counter() - start
+    print(f"\nDone! {success} converted, {skipped} skipped, {failed} failed in {elapsed:.1f}s")
     if total_input > 0:
         print(f"Total: {total_input // (1024*1024)}MB → {total_output // (1024*1024)}MB "
               f"({(1 - total_output / total_input) * 100:.0f}% reduction)")
+    if elapsed > 0:
+        print(f"Throughput: {success / elapsed:.1f} images/s, "
+              f"{total_input / (1024*1024) / elapsed:.1f} MB/s")
+    recorder.print_summary()
+    recorder.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+"""
+One entry point for the asset tools, run from the repo root:
+
+    python -m pathtools generate [image_generator.py options]
+    python -m pathtools optimize [optimize_images.py options]
+    python -m pathtools prompts
+    python -m pathtools bundles
+    python -m pathtools search
+    python -m pathtools ledger
+    python -m pathtools bench    [benchmarks.run_all options]
+    python -m pathtools status
+    python -m pathtools plan     [--json]
+    python -m pathtools dedup    [image_dedup.py options]
+    python -m pathtools store    ingest|checkout|gc [options]
+    python -m pathtools assets   fingerprint|prune|compress [options]
+
+Each subcommand imports its tool only when it runs, so vertexai, PIL and
+NumPy never load for `status` and `plan`, which only read JSON, directory
+listings and the SQLite ledger.
+"""
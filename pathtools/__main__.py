@@ -0,0 +1,45 @@
+import importlib
+import sys
+
+# command -> (module with a main(), description)
+COMMANDS = {
+    "generate": ("image_generator", "generate event images with Imagen"),
+    "optimize": ("optimize_images", "convert generated PNGs to web variants"),
+    "prompts": ("prepare_data", "rebuild src/data_with_prompts.json"),
+    "bundles": ("build_bundles", "split src/data.json into per-level client bundles"),
+    "search": ("build_search_index", "build the client search index from src/data.json"),
+    "ledger": ("generation_ledger", "summarise the generation ledger"),
+    "bench": ("benchmarks.run_all", "run the benchmark suite"),
+    "status": ("pathtools.status", "show asset coverage (fast, no heavy imports)"),
+    "plan": ("pathtools.plan", "dry run: missing, stale, misnamed and orphaned assets"),
+    "dedup": ("image_dedup", "find near-duplicate generated images"),
+    "store": ("master_store", "content-addressed master PNG store (ingest/checkout/gc)"),
+    "assets": ("static_assets", "fingerprint public/ files, prune or precompress a build"),
+}
+
+
+def usage():
+    lines = ["usage: python -m pathtools <command> [options]", "", "commands:"]
+    lines += [f"  {name:10s} {desc}" for name, (_, desc) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(COMMANDS[command][0])
+    # Tools parse sys.argv themselves; make --help show the subcommand
+    sys.argv = [f"pathtools {command}", *rest]
+    module.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
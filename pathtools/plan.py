@@ -0,0 +1,226 @@
+"""
+Dry-run planner: what would `generate` and `optimize` do right now?
+
+Indexes generated_images/, public/images/ (one os.scandir each) and the
+event store once, then diffs them:
+
+  missing    event has no PNG (a paid API call) or no WebP (an encode)
+  misnamed   file carries a live event id but an old title -- the ledger
+             moves these instead of regenerating; rename the WebPs too
+  orphaned   file matches no event id at all
+  stale      the optimizer would re-encode it: no manifest entry, encoder
+             settings changed, an output missing, or the PNG's size (or,
+             when only its mtime moved, its hash) differs from the record.
+             Mtimes alone never count, so a fresh checkout isn't stale.
+             Pass the same --target-ssim / --budget-kb as the optimize run
+             being planned: a tuned and an untuned build each see the
+             other's outputs as stale
+
+and estimates API calls and wall time from image_generator's rate and
+worker defaults. The output formats depend on the Pillow build, which
+this doesn't import; the formats on record are listed instead, and a
+Pillow that differs from them re-encodes everything. Standard library
+only: image_generator and generation_ledger import nothing heavy at
+module level.
+
+Usage:
+    python -m pathtools plan [--data FILE] [--json] [--latency SECS]
+                             [--target-ssim 0.95] [--budget-kb 60]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+from asset_names import VARIANT_SUFFIX, event_stem, stem_event_id
+from event_store import EventStore
+from fileio import file_sha256, load_json
+from generation_ledger import LEDGER_FILE
+from image_generator import DELAY_BETWEEN, JSON_FILE, WORKERS
+from image_generator import OUTPUT_DIR as GENERATED_DIR
+
+# Mirrors optimize_images defaults, which can't be imported without Pillow
+PUBLIC_DIR = "public/images"
+MANIFEST_FILE = os.path.join(PUBLIC_DIR, ".manifest.json")
+RATE_PER_MIN = 60 / DELAY_BETWEEN
+LATENCY_SECS = 12.0   # typical Imagen 3 round trip
+# optimize_images.encoder_settings(tune), minus "formats" (depends on the
+# Pillow build)
+ENCODER_SETTINGS = {"width": 800, "height": 600, "quality": 80, "avif_quality": 60,
+                    "widths": [1200, 800, 400], "placeholder": [16, 12]}
+SSIM_METRIC = "gaussian-1.5@800x600"  # optimize_images.SSIM_METRIC
+
+
+def encoder_settings(tune=None):
+    return {**ENCODER_SETTINGS, "tune": tune,
+            **({"ssim_metric": SSIM_METRIC} if tune else {})}
+
+
+def scan(directory, extension):
+    """(stems of matching files, every file name); variants fold into their base stem."""
+    stems, names = set(), set()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                names.add(entry.name)
+                if entry.name.lower().endswith(extension) and entry.is_file():
+                    stems.add(VARIANT_SUFFIX.sub("", os.path.splitext(entry.name)[0]))
+    except FileNotFoundError:
+        pass
+    return stems, names
+
+
+def is_stale(entry, png_path, public_names, settings=None):
+    """Mirrors optimize_images.is_up_to_date: would this PNG be re-encoded?"""
+    if not entry or not entry.get("outputs"):
+        return True
+    recorded = {k: v for k, v in (entry.get("settings") or {}).items() if k != "formats"}
+    if recorded != (settings or encoder_settings()):
+        return True
+    if any(output["file"] not in public_names for output in entry["outputs"]):
+        return True
+    st = os.stat(png_path)
+    if st.st_size != entry.get("size"):
+        return True
+    # Only hash when the mtime moved (a checkout, a touch): same bytes, not stale
+    return st.st_mtime_ns != entry.get("mtime_ns") and file_sha256(png_path) != entry.get("sha256")
+
+
+def blocked_event_ids(path):
+    """Events whose only ledger outcome is a safety block (won't be retried)."""
+    if not os.path.exists(path):
+        return set()
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT event_id, status FROM generations").fetchall()
+    except sqlite3.OperationalError:
+        return set()
+    finally:
+        conn.close()
+    statuses = {}
+    for event_id, status in rows:
+        statuses.setdefault(event_id, set()).add(status)
+    return {eid for eid, s in statuses.items() if s == {"blocked"}}
+
+
+def classify(stems, expected, ids):
+    """Split unexpected stems into misnamed (live id, old title) and orphaned."""
+    misnamed, orphaned = [], []
+    for stem in sorted(set(stems) - expected):
+        (misnamed if stem_event_id(stem) in ids else orphaned).append(stem)
+    return misnamed, orphaned
+
+
+def build_plan(store, generated_dir=GENERATED_DIR, public_dir=PUBLIC_DIR,
+               ledger_file=LEDGER_FILE, manifest_file=MANIFEST_FILE,
+               rate_per_min=RATE_PER_MIN, workers=WORKERS, latency=LATENCY_SECS,
+               tune=None):
+    events = {event_stem(e): e for e in store.events}
+    expected = set(events)
+    ids = store.by_id.keys()
+
+    pngs, _ = scan(generated_dir, ".png")
+    webps, public_names = scan(public_dir, ".webp")
+    blocked = blocked_event_ids(ledger_file)
+
+    manifest = load_json(manifest_file)
+
+    png_misnamed, png_orphaned = classify(pngs, expected, ids)
+    webp_misnamed, webp_orphaned = classify(webps, expected, ids)
+    # A misnamed PNG means the image exists under an old title: no API call needed
+    renamed_ids = {stem_event_id(s) for s in png_misnamed}
+
+    missing_png = sorted(expected - pngs)
+    to_generate = [s for s in missing_png
+                   if events[s].id not in blocked and events[s].id not in renamed_ids]
+    missing_webp = sorted((expected & pngs) - webps)
+
+    settings = encoder_settings(tune)
+    stale = sorted(
+        s for s in expected & pngs & webps
+        if is_stale(manifest.get(s + ".webp"), os.path.join(generated_dir, s + ".png"),
+                     public_names, settings)
+    )
+    formats = sorted({"+".join(entry["settings"]["formats"]) for key, entry in manifest.items()
+                      if not key.startswith("audio:")
+                      and (entry.get("settings") or {}).get("formats")})
+
+    calls = len(to_generate)
+    wall = max(calls * 60 / rate_per_min, calls * latency / max(1, workers)) if calls else 0.0
+    return {
+        "events": len(events),
+        "missing_png": missing_png,
+        "missing_webp": missing_webp,
+        "stale_webp": stale,
+        "misnamed_png": png_misnamed,
+        "misnamed_webp": webp_misnamed,
+        "orphaned_png": png_orphaned,
+        "orphaned_webp": webp_orphaned,
+        "blocked": sorted(blocked & store.by_id.keys()),
+        "tune": tune,
+        "formats": formats,
+        "api_calls": calls,
+        "est_generate_s": round(wall, 1),
+        "to_encode": len(missing_webp) + len(stale) + calls,
+    }
+
+
+def print_plan(plan):
+    print(f"  {plan['events']} events")
+    for key, label in (
+        ("missing_png", "missing PNG"),
+        ("missing_webp", "missing WebP"),
+        ("stale_webp", "stale WebP"),
+        ("misnamed_png", "misnamed PNG"),
+        ("misnamed_webp", "misnamed WebP"),
+        ("orphaned_png", "orphaned PNG"),
+        ("orphaned_webp", "orphaned WebP"),
+    ):
+        items = plan[key]
+        if items:
+            shown = ", ".join(items[:5]) + (f", … (+{len(items) - 5})" if len(items) > 5 else "")
+            print(f"  {label:14s} {len(items):>5d}  {shown}")
+    if plan["blocked"]:
+        print(f"  {'blocked':14s} {len(plan['blocked']):>5d}  (skipped until the prompt changes)")
+
+    if plan["formats"]:
+        print(f"  {'formats':14s} {', '.join(plan['formats'])} on record "
+              "(a Pillow with other formats re-encodes everything)")
+
+    minutes, seconds = divmod(int(plan["est_generate_s"]), 60)
+    print(f"\n  generate: {plan['api_calls']} API calls, ~{minutes}m{seconds:02d}s")
+    print(f"  optimize: {plan['to_encode']} images to encode")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pathtools plan", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default=JSON_FILE)
+    parser.add_argument("--generated-dir", default=GENERATED_DIR)
+    parser.add_argument("--public-dir", default=PUBLIC_DIR)
+    parser.add_argument("--rate", type=float, default=RATE_PER_MIN, help="requests per minute")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--latency", type=float, default=LATENCY_SECS,
+                        help="assumed seconds per request")
+    parser.add_argument("--target-ssim", type=float,
+                        help="plan for an optimize run with this --target-ssim")
+    parser.add_argument("--budget-kb", type=int,
+                        help="plan for an optimize run with this --budget-kb")
+    parser.add_argument("--json", action="store_true", help="print the full plan as JSON")
+    args = parser.parse_args(argv)
+    tune = None
+    if args.target_ssim is not None or args.budget_kb is not None:
+        tune = {"ssim": args.target_ssim, "budget_kb": args.budget_kb}
+
+    plan = build_plan(EventStore.load(args.data), args.generated_dir, args.public_dir,
+                      manifest_file=os.path.join(args.public_dir, ".manifest.json"),
+                      rate_per_min=args.rate, workers=args.workers, latency=args.latency,
+                      tune=tune)
+    if args.json:
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+    else:
+        print_plan(plan)
+
+
+if __name__ == "__main__":
+    main()
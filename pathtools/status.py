@@ -0,0 +1,71 @@
+"""
+Quick asset coverage report: events in the data JSON vs generated PNGs,
+optimized WebPs, ledger rows and in-progress checkpoints.
+
+Standard library only, no per-file stat calls and the event store's
+cached load, so it runs in tens of milliseconds.
+"""
+
+import glob
+import json
+import os
+import sqlite3
+
+from asset_names import event_stem
+from event_store import EventStore
+from generation_ledger import LEDGER_FILE
+from image_generator import JSON_FILE
+from image_generator import OUTPUT_DIR as GENERATED_DIR
+
+PUBLIC_DIR = "public/images"  # optimize_images.OUTPUT_DIR, which needs Pillow
+
+
+def list_stems(directory, extension):
+    try:
+        return {os.path.splitext(name)[0] for name in os.listdir(directory)
+                if name.lower().endswith(extension)}
+    except FileNotFoundError:
+        return set()
+
+
+def ledger_counts(path):
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM generations GROUP BY status"))
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def main():
+    store = EventStore.load(JSON_FILE)
+
+    pngs = list_stems(GENERATED_DIR, ".png")
+    webps = list_stems(PUBLIC_DIR, ".webp")
+
+    print(f"  {'level':32s} {'events':>6s} {'png':>5s} {'webp':>5s}")
+    totals = [0, 0, 0]
+    for level in store.levels:
+        stems = [event_stem(e) for e in level.events]
+        row = [len(stems), sum(s in pngs for s in stems), sum(s in webps for s in stems)]
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"  {level.name[:32]:32s} {row[0]:>6d} {row[1]:>5d} {row[2]:>5d}")
+    print(f"  {'total':32s} {totals[0]:>6d} {totals[1]:>5d} {totals[2]:>5d}")
+
+    counts = ledger_counts(LEDGER_FILE)
+    if counts is None:
+        print(f"\n  Ledger: none yet ({LEDGER_FILE})")
+    else:
+        print("\n  Ledger: " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+
+    for path in sorted(glob.glob(os.path.join(GENERATED_DIR, ".checkpoint*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            done = len(json.load(f).get("done", []))
+        print(f"  Checkpoint: {os.path.basename(path)} ({done} events done)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Single-pass data pipeline: src/data.json -> src/data_with_prompts.json.
+
+Loads the source once, runs every prompt stage over each event, and only
+rewrites the output (atomically, via a temp file + rename) when its content
+actually changed, so an unchanged run doesn't bust Vite's module cache.
+Coverage for each stage -- events it had nothing for, and entries with no
+matching event -- is reported in the same pass.
+
+A stage is a function that fills in one field on an event and returns
+False when it has no data for that event:
+
+    image_prompt   inject_prompts.add_image_prompt
+    visual_prompt  generate_visual_prompts.add_visual_prompt
+
+Usage:
+    python prepare_data.py
+"""
+
+import json
+
+from fileio import write_if_changed
+from generate_visual_prompts import VISUAL_PROMPTS, add_visual_prompt
+from inject_prompts import add_image_prompt
+
+# ================= CONFIGURATION =================
+SOURCE_FILE = "src/data.json"
+OUTPUT_FILE = "src/data_with_prompts.json"
+# =================================================
+
+STAGES = [
+    ("image_prompt", add_image_prompt),
+    ("visual_prompt", add_visual_prompt),
+]
+
+
+def run_stages(data, stages=STAGES):
+    """Apply every stage to every event in one walk; returns {stage: [uncovered events]}."""
+    missing = {name: [] for name, _ in stages}
+    for level in data["levels"]:
+        for event in level["events"]:
+            for name, stage in stages:
+                if stage(event) is False:
+                    missing[name].append(event)
+    return missing
+
+
+def main():
+    with open(SOURCE_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    missing = run_stages(data)
+    event_ids = {e["id"] for level in data["levels"] for e in level["events"]}
+    total = len(event_ids)
+
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    if write_if_changed(OUTPUT_FILE, text):
+        print(f"Wrote {OUTPUT_FILE} ({total} events)")
+    else:
+        print(f"{OUTPUT_FILE} unchanged ({total} events)")
+
+    for name, events in missing.items():
+        print(f"  {name:14s} {total - len(events)}/{total} events covered")
+    for name, events in missing.items():
+        if events:
+            print(f"\nWARNING: {len(events)} events have no {name}:")
+            for event in events:
+                print(f"  ID {event['id']}: {event['title']}")
+
+    orphans = sorted(set(VISUAL_PROMPTS) - event_ids)
+    if orphans:
+        print(f"\nWARNING: VISUAL_PROMPTS has entries for unknown ids: "
+              f"{', '.join(map(str, orphans))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
 import './style.css'
 import Sortable from 'sortablejs'
-import gameData from './data.json'
+import levelIndex from './levels/index.json'
+
+// Per-level event bundles written by build_bundles.py, one lazy chunk each
+const levelBundles = import.meta.glob('./levels/level-*.json', { import: 'default' })
+
+// Responsive srcset map written by optimize_images.py (absent until it has run)
+const imageVariants = Object.values(
+  import.meta.glob('./image_variants.json', { eager: true, import: 'default' })
+)[0] || {}
+
+// Opus/AAC sound effects written by optimize_images.py (absent until it has run)
+const audioVariants = Object.values(
+  import.meta.glob('./audio_variants.json', { eager: true, import: 'default' })
+)[0] || {}
+
+// Content-hashed URLs written by static_assets.py (absent until it has run)
+const assetURLs = Object.values(
+  import.meta.glob('./asset_urls.json', { eager: true, import: 'default' })
+)[0] || {}
 
 // ── Constants ──
 const CARDS_PER_ROUND = 5
@@ -14,7 +32,7 @@ const MUSIC_VOLUME_KEY = 'path-of-all-things-music'
 // ── State ──
 const state = {
   currentLevel: 0,
-  levels: gameData.levels,
+  levels: levelIndex.levels.map(level => ({ ...level })),
   activeEvents: [],
   sortableInstance: null,
   isRevealed: false,
@@ -32,20 +50,34 @@ const inkBleed = document.getElementById('ink-bleed')
 // ── Audio ──
 const BASE = import.meta.env.BASE_URL
 
-const bgMusic = new Audio(`${BASE}music.mp3`)
+// Site URL for a file in public/, fingerprinted when the manifest has it
+function assetURL(path) {
+  return BASE + (assetURLs[decodeURIComponent(path)] || path)
+}
+
+// Best transcoded variant this browser can play, else the original file
+const AUDIO_TYPES = { opus: 'audio/ogg; codecs=opus', aac: 'audio/mp4; codecs=mp4a.40.2' }
+const audioProbe = document.createElement('audio')
+function audioURL(file) {
+  const variants = audioVariants[file] || {}
+  const fmt = Object.keys(AUDIO_TYPES).find(f => variants[f] && audioProbe.canPlayType(AUDIO_TYPES[f]))
+  return assetURL(fmt ? variants[fmt] : file)
+}
+
+const bgMusic = new Audio(audioURL('music.mp3'))
 bgMusic.loop = true
 bgMusic.volume = 0.12
 bgMusic.preload = 'auto'
 
 // Sound effects
 const sfx = {
-  cardMove:   new Audio(`${BASE}Card movement - Epidemic Sound.wav`),
-  incorrect:  new Audio(`${BASE}Incorrect_Wood Impact.mp3`),
-  correct:    new Audio(`${BASE}All 5 Correct_Japanese Instrument.wav`),
-  modalOpen:  new Audio(`${BASE}Modal Open - Epidemic Sound.wav`),
-  nextLevel:  new Audio(`${BASE}Next Level_Bamboo Chimes.wav`),
-  finishGame: new Audio(`${BASE}Finish Game_Temple Bowl.wav`),
-  gameStart:  new Audio(`${BASE}Game start_crystal bowl.wav`),
+  cardMove:   new Audio(audioURL('Card movement - Epidemic Sound.wav')),
+  incorrect:  new Audio(audioURL('Incorrect_Wood Impact.mp3')),
+  correct:    new Audio(audioURL('All 5 Correct_Japanese Instrument.wav')),
+  modalOpen:  new Audio(audioURL('Modal Open - Epidemic Sound.wav')),
+  nextLevel:  new Audio(audioURL('Next Level_Bamboo Chimes.wav')),
+  finishGame: new Audio(audioURL('Finish Game_Temple Bowl.wav')),
+  gameStart:  new Audio(audioURL('Game start_crystal bowl.wav')),
 }
 
 // Set volumes
@@ -368,7 +400,61 @@ function createCardHTML(event) {
 // ── Image path helper ──
 function getEventImagePath(event) {
   const safeTitle = event.title.replace(/ /g, '_').replace(/\//g, '-').replace(/'/g, '')
-  return `${BASE}images/${event.id}_${safeTitle}.webp`
+  return assetURL(`images/${event.id}_${safeTitle}.webp`)
+}
+
+const IMAGE_SIZES = '(max-width: 768px) 92vw, min(38vw, 29rem)'
+const IMAGE_FALLBACK = "(this.closest('picture')||this).replaceWith(Object.assign(document.createElement('div'),{className:'modal-image-placeholder',innerHTML:'<span class=\\'modal-image-icon\\'>&#x25CC;</span>'}))"
+
+// Paint the blurred placeholder, then the level atlas thumbnail, behind the
+// full image while it downloads
+function getImagePreviewStyle(variants) {
+  const layers = []
+  const a = variants.atlas
+  if (a) {
+    const cols = a.width / a.w
+    const rows = a.height / a.h
+    const x = cols > 1 ? a.x / (a.width - a.w) * 100 : 0
+    const y = rows > 1 ? a.y / (a.height - a.h) * 100 : 0
+    layers.push(`url('${assetURL(a.src)}') ${x}% ${y}% / ${cols * 100}% ${rows * 100}% no-repeat`)
+  }
+  if (variants.placeholder) {
+    layers.push(`url('${variants.placeholder}') center / cover no-repeat`)
+  }
+  return layers.length ? `style="background: ${layers.join(', ')}"` : ''
+}
+
+// Warm the level's thumbnail sheet so info modals open with a preview
+function preloadLevelAtlas(level) {
+  const sheets = new Set(level.events.map(e => imageVariants[e.id]?.atlas?.src).filter(Boolean))
+  sheets.forEach(src => { new Image().src = assetURL(src) })
+}
+
+// <picture> with AVIF/WebP sources and a JPEG fallback when variants exist
+function getEventImageHTML(event) {
+  const variants = imageVariants[event.id]
+  if (!variants) {
+    return `<img src="${getEventImagePath(event)}" alt="${event.title}" class="modal-img" onerror="${IMAGE_FALLBACK}" />`
+  }
+
+  const withBase = srcset => srcset.split(', ').map(c => {
+    const [url, width] = c.split(' ')
+    return `${assetURL(url)} ${width}`
+  }).join(', ')
+  const sources = ['avif', 'webp']
+    .filter(fmt => variants.srcset[fmt])
+    .map(fmt => `<source type="image/${fmt}" srcset="${withBase(variants.srcset[fmt])}" sizes="${IMAGE_SIZES}" />`)
+    .join('')
+  const fallback = variants.srcset.jpeg
+    ? `srcset="${withBase(variants.srcset.jpeg)}" sizes="${IMAGE_SIZES}"`
+    : ''
+
+  return `
+    <picture class="modal-picture">
+      ${sources}
+      <img src="${assetURL(variants.src)}" ${fallback} width="${variants.width}" height="${variants.height}" alt="${event.title}" class="modal-img" ${getImagePreviewStyle(variants)} onerror="${IMAGE_FALLBACK}" />
+    </picture>
+  `
 }
 
 // ── Info Modal ──
@@ -381,8 +467,6 @@ function showInfoModal(event) {
     .map(p => `<p>${p}</p>`)
     .join('')
 
-  const imagePath = getEventImagePath(event)
-
   const overlay = document.createElement('div')
   overlay.className = 'modal-overlay'
   overlay.innerHTML = `
@@ -395,7 +479,7 @@ function showInfoModal(event) {
       <div class="modal-divider"></div>
       <div class="modal-columns">
         <div class="modal-image">
-          <img src="${imagePath}" alt="${event.title}" class="modal-img" onerror="this.replaceWith(Object.assign(document.createElement('div'),{className:'modal-image-placeholder',innerHTML:'<span class=\\'modal-image-icon\\'>&#x25CC;</span>'}))" />
+          ${getEventImageHTML(event)}
         </div>
         <div class="modal-body">${bodyHTML}</div>
       </div>
@@ -417,6 +501,112 @@ function showInfoModal(event) {
   })
 }
 
+// ── Search ──
+// Only offered on the end screens, where it can't give away a level's
+// order. search.js and its index are fetched the first time it opens.
+const SEARCH_RESULT_LIMIT = 50
+let searchLoading = null
+
+function loadSearch() {
+  if (!searchLoading) {
+    searchLoading = import('./search.js')
+      .then(async ({ loadSearchIndex, search }) => ({ index: await loadSearchIndex(), search }))
+      .catch(err => {
+        searchLoading = null  // let the next keystroke retry
+        throw err
+      })
+  }
+  return searchLoading
+}
+
+function parseYear(value, fallback) {
+  return value.trim() === '' || isNaN(value) ? fallback : Number(value)
+}
+
+function showSearchModal() {
+  const existing = document.querySelector('.modal-overlay')
+  if (existing) existing.remove()
+
+  const overlay = document.createElement('div')
+  overlay.className = 'modal-overlay'
+  overlay.innerHTML = `
+    <div class="modal-card search-card">
+      <button class="modal-close" aria-label="Close">&times;</button>
+      <div class="modal-header">
+        <div class="modal-title">Search the Path</div>
+        <div class="search-fields">
+          <input class="search-text" type="search" placeholder='Words, or "a phrase"' aria-label="Words" />
+          <input class="search-year" type="number" placeholder="From year" aria-label="From year" />
+          <input class="search-year" type="number" placeholder="To year" aria-label="To year" />
+        </div>
+      </div>
+      <div class="modal-divider"></div>
+      <ul class="search-results"></ul>
+    </div>
+  `
+
+  document.body.appendChild(overlay)
+  playSFX(sfx.modalOpen)
+
+  const [textInput, fromInput, toInput] = overlay.querySelectorAll('input')
+  const results = overlay.querySelector('.search-results')
+  textInput.focus()
+
+  async function update() {
+    const query = {
+      text: textInput.value,
+      from: parseYear(fromInput.value, -Infinity),
+      to: parseYear(toInput.value, Infinity),
+    }
+    if (!query.text.trim() && query.from === -Infinity && query.to === Infinity) {
+      results.innerHTML = ''
+      return
+    }
+    let found
+    try {
+      const { index, search } = await loadSearch()
+      found = search(index, query)
+    } catch (err) {
+      console.error('Search unavailable:', err)
+      results.innerHTML = '<li class="search-empty">Search is unavailable. Try again in a moment.</li>'
+      return
+    }
+    results.innerHTML = found.length ? found.slice(0, SEARCH_RESULT_LIMIT).map(e => `
+      <li>
+        <button class="search-result" data-id="${e.id}" data-level="${e.level}">
+          <span class="search-result-title">${e.title}</span>
+          <span class="search-result-year">${formatYear(e.year)}</span>
+        </button>
+      </li>
+    `).join('') + (found.length > SEARCH_RESULT_LIMIT
+      ? `<li class="search-empty">${found.length - SEARCH_RESULT_LIMIT} more: narrow the search</li>` : '')
+      : '<li class="search-empty">Nothing on the path matches.</li>'
+  }
+
+  function closeModal() {
+    playSFX(sfx.modalOpen)
+    overlay.classList.add('closing')
+    setTimeout(() => overlay.remove(), 300)
+  }
+
+  for (const input of [textInput, fromInput, toInput]) input.addEventListener('input', update)
+  results.addEventListener('click', async (e) => {
+    const button = e.target.closest('.search-result')
+    if (!button) return
+    try {
+      const level = await loadLevel(Number(button.dataset.level))
+      const event = level?.events.find(ev => ev.id === Number(button.dataset.id))
+      if (event) showInfoModal(event)
+    } catch (err) {
+      console.error('Failed to load level:', err)
+    }
+  })
+  overlay.querySelector('.modal-close').addEventListener('click', closeModal)
+  overlay.addEventListener('click', (e) => {
+    if (e.target === overlay) closeModal()
+  })
+}
+
 // ── Reveal Correct Order ──
 // Sorts cards into correct order in the DOM, then reveals them
 function revealCorrectOrder(feedbackMsg, feedbackColor) {
@@ -479,10 +669,43 @@ function revealCorrectOrder(feedbackMsg, feedbackColor) {
   }, sortedCards.length * 200 + 400)
 }
 
+// ── Level Data ──
+// Fetch a level's events on first use; the promise is cached so repeat
+// calls (and prefetches) share one request. A failed fetch is forgotten,
+// so the next call tries again.
+function loadLevel(index) {
+  const level = state.levels[index]
+  if (!level) return Promise.resolve(null)
+  if (!level.loading) {
+    level.loading = levelBundles[`./levels/${level.file}`]().then(bundle => {
+      level.events = bundle.events
+      return level
+    }, err => {
+      level.loading = null
+      throw err
+    })
+  }
+  return level.loading
+}
+
+// Prefetch in the background; a failure is retried when the level is needed
+function prefetchLevel(index) {
+  loadLevel(index).catch(err => console.warn(`Prefetch of level ${index + 1} failed:`, err))
+}
+
 // ── Render Level ──
-function renderLevel() {
-  const level = state.levels[state.currentLevel]
+async function renderLevel() {
+  let level
+  try {
+    level = await loadLevel(state.currentLevel)
+  } catch (err) {
+    console.error('Failed to load level:', err)
+    renderLevelError()
+    return
+  }
+  prefetchLevel(state.currentLevel + 1)
   state.activeEvents = pickRandomEvents(level.events, CARDS_PER_ROUND)
+  preloadLevelAtlas(level)
   const shuffledEvents = shuffleArray(state.activeEvents)
   state.isRevealed = false
   state.levelErrors = 0
@@ -536,6 +759,21 @@ function renderLevel() {
   renderHUD()
 }
 
+function renderLevelError() {
+  app.innerHTML = `
+    <div class="completion-message text-center max-w-lg">
+      <p class="text-lg italic opacity-60 leading-relaxed mb-8" style="font-family: var(--font-serif);">
+        The path ahead could not be reached.<br>
+        Check your connection and try again.
+      </p>
+      <button class="btn-contemplate" id="btn-retry">
+        Try Again
+      </button>
+    </div>
+  `
+  document.getElementById('btn-retry').addEventListener('click', renderLevel)
+}
+
 // ── Check Order ──
 function checkOrder() {
   if (state.isRevealed) return
@@ -675,9 +913,14 @@ function showGameOver() {
         <button class="btn-contemplate mt-10" id="btn-restart">
           Begin Again
         </button>
+        <div>
+          <button class="btn-search mt-6" id="btn-search">Search the Path</button>
+        </div>
       </div>
     `
 
+    document.getElementById('btn-search').addEventListener('click', showSearchModal)
+
     document.getElementById('btn-restart').addEventListener('click', () => {
       playSFX(sfx.gameStart)
       inkBleed.classList.add('active')
@@ -742,9 +985,14 @@ function showCompletion() {
         <button class="btn-contemplate mt-10" id="btn-restart">
           Begin Again
         </button>
+        <div>
+          <button class="btn-search mt-6" id="btn-search">Search the Path</button>
+        </div>
       </div>
     `
 
+    document.getElementById('btn-search').addEventListener('click', showSearchModal)
+
     document.getElementById('btn-restart').addEventListener('click', () => {
       playSFX(sfx.gameStart)
       inkBleed.classList.add('active')
@@ -765,6 +1013,7 @@ function showCompletion() {
 
 // ── Init ──
 document.getElementById('music-toggle').addEventListener('click', toggleMusic)
+prefetchLevel(0)
 showStartScreen()
 
 function initEmbers() {
@@ -0,0 +1,216 @@
+// Client for the search index written by build_search_index.py, loaded
+// on demand by the end screens' search in main.js:
+//
+//   const index = await loadSearchIndex()
+//   search(index, { text: 'black death', from: 1000, to: 1500 })
+//     → [{ id, level, title, year }, ...] oldest first
+//
+// Bare words must all appear (the last one, unstemmed, also matches as a
+// prefix of any indexed word, for search-as-you-type); "quoted words"
+// must appear as a phrase. The year range is a binary search over the
+// sorted years, and posting lists are decoded only for the query's terms.
+
+// Resolved URL of the index (absent until build_search_index.py has run)
+const indexURL = Object.values(
+  import.meta.glob('./search_index.bin', { eager: true, query: '?url', import: 'default' })
+)[0]
+
+// Must match build_search_index.py
+const STOP_WORDS = new Set(`
+  a an and are as at be been but by for from had has have he her his in into is it its
+  of on or she that the their them then there these they this to was were which while
+  who will with
+`.split(/\s+/).filter(Boolean))
+
+function tokenize(text) {
+  return text.toLowerCase().normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+    .replace(/['’]s\b/g, '').match(/[a-z0-9]+/g) || []
+}
+
+function stem(word) {
+  if (word.length <= 3 || /^\d+$/.test(word)) return word
+  if (word.endsWith('ies') && word.length > 4) return word.slice(0, -3) + 'y'
+  if (word.endsWith('sses')) return word.slice(0, -2)
+  if (word.endsWith('s') && !/(ss|us|is)$/.test(word)) return word.slice(0, -1)
+  for (const suffix of ['ing', 'ed']) {
+    if (word.endsWith(suffix) && word.length - suffix.length >= 3) {
+      word = word.slice(0, -suffix.length)
+      const last = word[word.length - 1]
+      if (last === word[word.length - 2] && !'lsz'.includes(last)) word = word.slice(0, -1)
+      return word
+    }
+  }
+  return word
+}
+
+// LEB128 varint reader over bytes, starting at pos
+function reader(bytes, pos) {
+  return {
+    pos,
+    varint() {
+      let n = 0, shift = 0, b
+      do {
+        b = bytes[this.pos++]
+        n += (b & 0x7f) * 2 ** shift
+        shift += 7
+      } while (b & 0x80)
+      return n
+    },
+  }
+}
+
+function decode(buffer) {
+  const view = new DataView(buffer)
+  const bytes = new Uint8Array(buffer)
+  const magic = String.fromCharCode(...bytes.subarray(0, 4))
+  if (magic !== 'PSIX' || view.getUint8(4) !== 2) throw new Error('unsupported search index')
+  const eventCount = view.getUint32(8, true)
+  const termCount = view.getUint32(12, true)
+  const wordCount = view.getUint32(16, true)
+  const years = new Float64Array(buffer, 24, eventCount)
+
+  const r = reader(bytes, 24 + eventCount * 8)
+  const text = new TextDecoder()
+
+  const events = []
+  for (let i = 0; i < eventCount; i++) {
+    const id = r.varint()
+    const level = r.varint()
+    const length = r.varint()
+    events.push({ id, level, title: text.decode(bytes.subarray(r.pos, r.pos + length)), year: years[i] })
+    r.pos += length
+  }
+
+  let previous = ''
+  const frontCoded = () => {
+    const shared = r.varint()
+    const length = r.varint()
+    previous = previous.slice(0, shared) + String.fromCharCode(...bytes.subarray(r.pos, r.pos + length))
+    r.pos += length
+    return previous
+  }
+  const terms = []
+  for (let i = 0; i < termCount; i++) terms.push(frontCoded())
+
+  // Inflected surface words and the term number each one stems to
+  previous = ''
+  const words = []
+  const wordTerms = new Uint32Array(wordCount)
+  for (let i = 0; i < wordCount; i++) {
+    words.push(frontCoded())
+    wordTerms[i] = r.varint()
+  }
+
+  // Byte offset of each term's posting block; blocks are decoded on demand
+  const postingStarts = new Uint32Array(termCount)
+  for (let i = 0; i < termCount; i++) {
+    const length = r.varint()
+    postingStarts[i] = r.pos
+    r.pos += length
+  }
+
+  return { bytes, years, events, terms, words, wordTerms, postingStarts, cache: new Map() }
+}
+
+export async function loadSearchIndex(url = indexURL) {
+  if (!url) throw new Error('no search index: run build_search_index.py')
+  const response = await fetch(url)
+  return decode(await response.arrayBuffer())
+}
+
+// First index whose value is >= target (or > target when after is set)
+function bisect(sorted, target, after = false) {
+  let lo = 0, hi = sorted.length
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1
+    if (sorted[mid] < target || (after && sorted[mid] === target)) lo = mid + 1
+    else hi = mid
+  }
+  return lo
+}
+
+// Map(doc → [positions]) for term number t
+function postings(index, t) {
+  let list = index.cache.get(t)
+  if (list) return list
+  const r = reader(index.bytes, index.postingStarts[t])
+  list = new Map()
+  let doc = 0
+  for (let count = r.varint(); count > 0; count--) {
+    doc += r.varint()
+    const positions = []
+    let p = 0
+    for (let n = r.varint(); n > 0; n--) positions.push(p += r.varint())
+    list.set(doc, positions)
+  }
+  index.cache.set(t, list)
+  return list
+}
+
+// Term numbers for a word: its stem, or when prefix, every term or
+// inflected word that starts with the word as typed
+function matchTerms(index, word, prefix) {
+  if (!prefix) {
+    const t = bisect(index.terms, stem(word))
+    return index.terms[t] === stem(word) ? [t] : []
+  }
+  const matched = new Set()
+  for (let t = bisect(index.terms, word); index.terms[t]?.startsWith(word); t++) matched.add(t)
+  for (let w = bisect(index.words, word); index.words[w]?.startsWith(word); w++) matched.add(index.wordTerms[w])
+  return [...matched]
+}
+
+// Docs in [lo, hi) containing any of the terms
+function termDocs(index, word, lo, hi, prefix) {
+  const docs = new Map()
+  for (const t of matchTerms(index, word, prefix)) {
+    for (const [doc, positions] of postings(index, t)) {
+      if (doc >= lo && doc < hi) docs.set(doc, docs.has(doc) ? [...docs.get(doc), ...positions] : positions)
+    }
+  }
+  return docs
+}
+
+// Docs containing the words as a phrase; stop words hold their place
+function phraseDocs(index, words, lo, hi) {
+  const parts = words.map((word, offset) => ({ word, offset })).filter(p => !STOP_WORDS.has(p.word))
+  if (!parts.length) return null
+  let matches = null  // doc → Set of phrase start positions
+  for (const { word, offset } of parts) {
+    const docs = termDocs(index, word, lo, hi, false)
+    const next = new Map()
+    for (const [doc, positions] of docs) {
+      const starts = positions.map(p => p - offset)
+      const kept = matches ? starts.filter(s => matches.get(doc)?.has(s)) : starts
+      if (kept.length) next.set(doc, new Set(kept))
+    }
+    matches = next
+    if (!matches.size) break
+  }
+  return new Set(matches.keys())
+}
+
+export function search(index, { text = '', from = -Infinity, to = Infinity } = {}) {
+  const lo = bisect(index.years, from)
+  const hi = bisect(index.years, to, true)
+
+  const filters = []
+  const phrases = [...text.matchAll(/"([^"]*)"?/g)].map(m => tokenize(m[1]))
+  phrases.forEach(words => {
+    const docs = phraseDocs(index, words, lo, hi)
+    if (docs) filters.push(docs)
+  })
+  const words = tokenize(text.replace(/"[^"]*"?/g, ' ')).filter(w => !STOP_WORDS.has(w))
+  // Still typing the last word unless the text ends in a space or quote
+  const typing = !/[\s"]$/.test(text)
+  words.forEach((word, i) => {
+    const prefix = typing && i === words.length - 1
+    filters.push(new Set(termDocs(index, word, lo, hi, prefix).keys()))
+  })
+
+  const results = []
+  for (let doc = lo; doc < hi; doc++) {
+    if (filters.every(docs => docs.has(doc))) results.push(index.events[doc])
+  }
+  return results
+}
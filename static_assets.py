@@ -0,0 +1,274 @@
+"""
+Long-lived caching for the game's static files.
+
+Files in public/ keep stable names (`images/{id}_{title}.webp`,
+`Game start_crystal bowl.wav`), so their URLs can't be cached for long:
+a redrawn image or re-encoded sound would be served stale. Three commands:
+
+  fingerprint  copy every image and sound in public/ to
+               public/static/<dir>/<name>.<sha256[:10]>.<ext> and write
+               src/asset_urls.json, the URL manifest src/main.js resolves
+               every image and sound URL through:
+                   {"images/1_The_Big_Bang.webp":
+                    "static/images/1_The_Big_Bang.3f2a9c1b7e.webp", ...}
+               A fingerprinted URL changes whenever the bytes do, so
+               public/static/ can be served with
+               `Cache-Control: max-age=31536000, immutable`. Copies no
+               file maps to any more are removed. Hashes are cached under
+               .cache/ by size + mtime, so reruns only read changed files.
+               optimize_images.py runs this after every build.
+  prune        delete from a Vite build (dist/ by default) every original
+               that has a fingerprinted copy there. Vite copies all of
+               public/, static/ included, so without this each image and
+               sound ships twice; main.js only ever requests the copies.
+               The default 800px WebPs (`images/{id}_{title}.webp`) are
+               kept: those URLs predate fingerprinting and are linked
+               from outside the game, so they stay valid. Variants
+               (`-{width}w`), atlases and sounds are only reachable
+               through the URL manifest and are removed.
+  compress     write .gz (and .br, if the brotli module is installed) next
+               to every text asset in a build, for servers that send
+               precompressed files. JSON imported by main.js (level
+               bundles, variant maps) ends up in the JS chunks, so it's
+               covered. Output is deterministic and only rewritten when stale.
+
+Hosting: GitHub Pages, where the deploy workflow publishes, sets its own
+`Cache-Control: max-age=600` on everything and gzips on the fly; it
+ignores .gz/.br files and can't mark static/ immutable. There,
+fingerprinting still means a changed image is never served stale, so the
+workflow runs `fingerprint` before `vite build` and `prune` after it, but
+not `compress`. Self-hosted, serve the build with e.g. nginx:
+
+    location /the_path_of_all_things/static/ {
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+    gzip_static on;     # and brotli_static on; with ngx_brotli
+
+and run `compress` as well. All outputs are build artifacts, not
+committed. Standard library only (brotli optional).
+
+Usage:
+    python static_assets.py fingerprint
+    python static_assets.py prune [DIR]
+    python static_assets.py compress [DIR]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
+
+from asset_names import VARIANT_SUFFIX
+from fileio import file_sha256, load_json, write_json, write_json_if_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ================= CONFIGURATION =================
+PUBLIC_DIR = "public"
+STATIC_DIR = "static"  # under PUBLIC_DIR, and so under the site base
+URLS_FILE = "src/asset_urls.json"
+HASH_CACHE = os.path.join(".cache", "asset_hashes.json")
+HASH_LENGTH = 10
+FINGERPRINT_EXTENSIONS = (".webp", ".avif", ".jpg", ".png", ".wav", ".mp3", ".ogg", ".m4a")
+BUILD_DIR = "dist"
+COMPRESS_EXTENSIONS = (".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml",
+                       ".webmanifest", ".bin")  # .bin: the search index
+COMPRESS_MIN_BYTES = 1024  # smaller responses aren't worth a second request path
+# =================================================
+
+
+def list_assets(public_dir=PUBLIC_DIR):
+    """Site-relative POSIX paths of every file to fingerprint, skipping static/ and dotfiles."""
+    paths = []
+    for root, dirs, files in os.walk(public_dir):
+        rel = os.path.relpath(root, public_dir)
+        if rel == ".":
+            dirs[:] = [d for d in dirs if d != STATIC_DIR]
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.startswith(".") and name.lower().endswith(FINGERPRINT_EXTENSIONS):
+                paths.append(name if rel == "." else f"{rel.replace(os.sep, '/')}/{name}")
+    return paths
+
+
+def hash_assets(paths, public_dir=PUBLIC_DIR, cache_path=HASH_CACHE, jobs=None):
+    """{path: sha256} for every path, reading only files whose size or mtime changed."""
+    cache = load_json(cache_path)
+    stats = {}
+    for path in paths:
+        st = os.stat(os.path.join(public_dir, path))
+        stats[path] = [st.st_size, st.st_mtime_ns]
+    todo = [p for p in paths if cache.get(p, {}).get("stat") != stats[p]]
+    if todo:
+        # hashlib releases the GIL on large buffers, so threads are enough
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            digests = pool.map(file_sha256, [os.path.join(public_dir, p) for p in todo])
+            for path, digest in zip(todo, digests):
+                cache[path] = {"stat": stats[path], "sha256": digest}
+    cache = {p: entry for p, entry in cache.items() if p in stats}
+    write_json(cache, cache_path)
+    return {p: entry["sha256"] for p, entry in cache.items()}, len(todo)
+
+
+def fingerprinted_name(path, sha256):
+    stem, ext = os.path.splitext(path)
+    return f"{STATIC_DIR}/{stem}.{sha256[:HASH_LENGTH]}{ext}"
+
+
+def fingerprint(public_dir=PUBLIC_DIR, urls_file=URLS_FILE, jobs=None):
+    """Copy every asset to its content-hashed name and write the URL manifest."""
+    paths = list_assets(public_dir)
+    hashes, rehashed = hash_assets(paths, public_dir, jobs=jobs)
+
+    wanted = set()
+    copied = 0
+    for path in paths:
+        name = fingerprinted_name(path, hashes[path])
+        target = os.path.join(public_dir, *name.split("/"))
+        wanted.add(os.path.normpath(target))
+        if os.path.exists(target):
+            continue
+        # A copy, not a hard link: the optimizer rewrites outputs in place,
+        # which would change the bytes behind an already-published hash
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = target + ".tmp"
+        shutil.copyfile(os.path.join(public_dir, path), tmp)
+        os.replace(tmp, target)
+        copied += 1
+
+    removed = 0
+    static_root = os.path.join(public_dir, STATIC_DIR)
+    for root, _, files in os.walk(static_root, topdown=False):
+        for name in files:
+            target = os.path.normpath(os.path.join(root, name))
+            if target not in wanted:
+                os.remove(target)
+                removed += 1
+        if root != static_root and not os.listdir(root):
+            os.rmdir(root)
+
+    urls = {path: quote(fingerprinted_name(path, hashes[path])) for path in paths}
+    written = write_json_if_changed(urls_file, urls)
+    print(f"Fingerprinted {len(paths)} assets into {static_root}/ ({rehashed} hashed, "
+          f"{copied} copied, {removed} stale removed)"
+          + (f"; wrote {urls_file}" if written else ""))
+    return urls
+
+
+def is_legacy_url(path):
+    """The default 800px WebP of an event, which keeps its unhashed URL."""
+    directory, _, name = path.rpartition("/")
+    stem, ext = os.path.splitext(name)
+    return directory == "images" and ext == ".webp" and not VARIANT_SUFFIX.search(stem)
+
+
+def prune(build_dir=BUILD_DIR, urls_file=URLS_FILE):
+    """Remove originals from build_dir once their fingerprinted copy is in it too."""
+    try:
+        with open(urls_file, "r", encoding="utf-8") as f:
+            urls = json.load(f)
+    except FileNotFoundError:
+        print(f"No {urls_file}: run fingerprint first; nothing pruned.")
+        return
+    removed = freed = kept = 0
+    for path, url in urls.items():
+        if is_legacy_url(path):
+            kept += 1
+            continue
+        original = os.path.join(build_dir, *path.split("/"))
+        copy = os.path.join(build_dir, *unquote(url).split("/"))
+        if os.path.isfile(original) and os.path.isfile(copy):
+            freed += os.path.getsize(original)
+            os.remove(original)
+            removed += 1
+    for root, _, _ in os.walk(build_dir, topdown=False):
+        if root != build_dir and not os.listdir(root):
+            os.rmdir(root)
+    print(f"Pruned {removed} originals with fingerprinted copies from {build_dir}/ "
+          f"({freed // 1024}KB); kept {kept} legacy image URLs")
+
+
+def compress_file(path):
+    """Write path.gz (and path.br) unless they are already newer than path."""
+    st = os.stat(path)
+    data = None
+    written = []
+    encoders = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli:
+        encoders.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for suffix, encode in encoders:
+        target = path + suffix
+        try:
+            if os.stat(target).st_mtime_ns >= st.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        packed = encode(data)
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, target)
+        written.append((suffix, len(packed)))
+    return path, st.st_size, written
+
+
+def compress(build_dir=BUILD_DIR, jobs=None):
+    """Precompress every text asset over COMPRESS_MIN_BYTES in build_dir."""
+    paths = []
+    for root, _, files in os.walk(build_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.lower().endswith(COMPRESS_EXTENSIONS) \
+                    and os.path.getsize(path) >= COMPRESS_MIN_BYTES:
+                paths.append(path)
+    if not brotli:
+        print("brotli module not installed: writing .gz only (pip install brotli for .br)")
+
+    totals = {}  # suffix -> [source bytes, compressed bytes]
+    # zlib and brotli release the GIL while compressing
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for path, size, written in pool.map(compress_file, paths):
+            for suffix, packed in written:
+                total = totals.setdefault(suffix, [0, 0])
+                total[0] += size
+                total[1] += packed
+                print(f"  ✓ {os.path.relpath(path, build_dir) + suffix:55s} "
+                      f"{size // 1024:>6d}KB → {packed // 1024:>5d}KB")
+    if not totals:
+        print(f"All {len(paths)} text assets in {build_dir}/ already compressed.")
+    for suffix, (size, packed) in sorted(totals.items()):
+        print(f"{suffix}: {size // 1024}KB → {packed // 1024}KB "
+              f"({(1 - packed / max(1, size)) * 100:.0f}% smaller)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("fingerprint", help=f"content-hashed copies + {URLS_FILE}")
+    p.add_argument("--jobs", "-j", type=int, default=None)
+    p = commands.add_parser("prune", help="drop originals a build also has fingerprinted")
+    p.add_argument("build_dir", nargs="?", default=BUILD_DIR)
+    p = commands.add_parser("compress", help="write .gz/.br next to a build's text assets")
+    p.add_argument("build_dir", nargs="?", default=BUILD_DIR)
+    p.add_argument("--jobs", "-j", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "fingerprint":
+        fingerprint(jobs=args.jobs)
+    elif args.command == "prune":
+        prune(args.build_dir)
+    else:
+        compress(args.build_dir, jobs=args.jobs)
+
+
+if __name__ == "__main__":
+    main()